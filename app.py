@@ -1,6 +1,8 @@
 from app import create_app
 
-app = create_app()
+# Password-hashing workers re-import this file as __mp_main__; they only need bcrypt
+if __name__ != "__mp_main__":
+    app = create_app()
 
 if __name__ == "__main__":
     app.run(debug=True, host="0.0.0.0", port=5000)
\ No newline at end of file
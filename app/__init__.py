@@ -25,18 +25,34 @@ def create_app(config_class=Config):
     # Remove the "../" since templates and static are now inside app/
     app = Flask(__name__, template_folder="templates", static_folder="static")
     app.config.from_object(config_class)
+    
+    # Leveled, queued logging for the app.* loggers (LOG_LEVEL, LOG_FORMAT, ...)
+    from app.logging_setup import configure_logging
+    configure_logging(app)
 
     # Initialize extensions
     bcrypt.init_app(app)
     login_manager.init_app(app)
     mail.init_app(app)
     
+    # Per-process TTL cache behind the Flask-Login user_loader
+    from app.models import init_user_cache
+    init_user_cache(app)
+    
+    # Server-Timing headers and per-request stage records (also times Mongo commands)
+    from app.timing import init_timing
+    init_timing(app)
+    
+    # Prometheus /metrics, aggregated across worker processes
+    from app.metrics import init_metrics
+    init_metrics(app)
+    
     try:
         client = MongoClient(app.config['MONGO_URI'])
         app.db = client["movie_app"]
         
         # Create collections if they don't exist
-        collections_to_create = ['users', 'chats', 'conversations']
+        collections_to_create = ['users', 'chats', 'conversations', 'conversation_messages']
         existing_collections = app.db.list_collection_names()
         
         for collection in collections_to_create:
@@ -48,10 +64,15 @@ def create_app(config_class=Config):
         app.users_col = app.db["users"]
         app.chats_col = app.db["chats"]  
         app.conversations_col = app.db["conversations"]  
+        app.conversation_messages_col = app.db["conversation_messages"]
+        
+        # Indexes, applied once per database as numbered migrations
+        from app.db_schema import migrate
+        migrate(app.db)
         
         print("DEBUG: MongoDB connected successfully")
         print(f"DEBUG: Existing collections: {existing_collections}")
-        print(f"DEBUG: Using collections: users, chats, conversations")
+        print(f"DEBUG: Using collections: users, chats, conversations, conversation_messages")
         
     except Exception as e:
         print(f"ERROR: MongoDB connection failed: {e}")
@@ -70,4 +91,36 @@ def create_app(config_class=Config):
     app.register_blueprint(auth_bp)
     app.register_blueprint(chatbot_bp)
     
+    # Cached, time-bounded translation for the chatbot
+    from app.translation import init_translation
+    init_translation(app)
+    
+    # Hashed, precompressed static files from scripts/build_assets.py
+    from app.assets import init_assets
+    init_assets(app)
+    
+    # Resized TMDB posters served from a local disk cache
+    from app.images import init_images
+    init_images(app)
+    
+    # Trending cards and the rendered home page are cached per process
+    from app.page_cache import init_page_cache
+    init_page_cache(app)
+    
+    # bcrypt hashing in a bounded process pool
+    from app.passwords import init_passwords
+    init_passwords(app)
+    
+    # Email is sent by background workers over pooled SMTP connections
+    from app.mailer import init_mailer
+    init_mailer(app)
+    
+    # Optional write-behind queue for chat conversation saves
+    from app.conversations import init_conversations
+    init_conversations(app)
+    
+    # Materialized chatbot fallback / genre lists, refreshed in the background
+    from app.curated import start_refresher
+    start_refresher(app)
+    
     return app
\ No newline at end of file
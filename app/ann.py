@@ -0,0 +1,222 @@
+"""Approximate nearest-neighbour search over the QA embedding store.
+
+The index is an inverted file (IVF): embeddings are clustered with spherical
+k-means and each row is filed under its nearest centroid. A query only scores
+the rows in its ``nprobe`` closest lists. With product quantization (PQ)
+enabled each row's residual from its centroid is stored as compact uint8 codes;
+candidates are first scored from those codes and only the best ``rerank`` of
+them are re-scored against the real embeddings.
+
+Everything is plain NumPy so it runs on CPU with no extra dependency, and the
+arrays are saved next to the QA store so they can be memory-mapped too:
+
+    ivf.json            parameters (lists, pq_m, dim, count)
+    ivf_centroids.npy   (n_lists, dim) float32
+    ivf_offsets.npy     (n_lists + 1) int64, list i is ids[offsets[i]:offsets[i+1]]
+    ivf_ids.npy         (count,) int32 row ids grouped by list
+    pq_codebooks.npy    (pq_m, 256, dim / pq_m) float32   (PQ only)
+    pq_codes.npy        (count, pq_m) uint8 in ivf_ids order (PQ only)
+"""
+import json
+import os
+import numpy as np
+
+# Rows converted to float32 at a time when scanning the fp16 matrix
+CHUNK_ROWS = 16384
+PQ_CENTROIDS = 256
+
+
+def _as_f32(block):
+    return np.asarray(block, dtype=np.float32)
+
+
+def _top_k(scores, k):
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def exact_search(embeddings, query, top_k=3):
+    """Brute-force cosine search; ``embeddings`` rows and ``query`` are normalised."""
+    query = _as_f32(query)
+    n = embeddings.shape[0]
+    scores = np.empty(n, dtype=np.float32)
+    for start in range(0, n, CHUNK_ROWS):
+        block = _as_f32(embeddings[start:start + CHUNK_ROWS])
+        scores[start:start + len(block)] = block @ query
+    top = _top_k(scores, top_k)
+    return top, scores[top]
+
+
+def _assign(data, centroids, metric="ip"):
+    """Index of the best centroid for every row, in chunks to bound memory."""
+    labels = np.empty(len(data), dtype=np.int32)
+    if metric == "l2":
+        c_norms = (centroids ** 2).sum(axis=1)
+    for start in range(0, len(data), CHUNK_ROWS):
+        block = _as_f32(data[start:start + CHUNK_ROWS])
+        sims = block @ centroids.T
+        if metric == "l2":
+            # argmin |x - c|^2 == argmax 2 x.c - |c|^2
+            sims = 2 * sims - c_norms
+        labels[start:start + len(block)] = sims.argmax(axis=1)
+    return labels
+
+
+def _kmeans(data, k, n_iter, rng, spherical):
+    data = _as_f32(data)
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    metric = "ip" if spherical else "l2"
+
+    for _ in range(n_iter):
+        labels = _assign(data, centroids, metric)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, data)
+
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            # Re-seed dead clusters from random rows
+            centroids[empty] = data[rng.choice(len(data), int(empty.sum()), replace=False)]
+        if spherical:
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    return centroids
+
+
+def build_ivf(embeddings, n_lists=None, pq_m=0, n_iter=15, train_size=100_000, seed=0):
+    """Cluster ``embeddings`` into an IVF index, optionally with PQ codes.
+
+    ``n_lists`` defaults to about sqrt(count). ``pq_m`` is the number of PQ
+    sub-vectors (must divide the embedding dim); 0 disables PQ.
+    """
+    rng = np.random.default_rng(seed)
+    n, dim = embeddings.shape
+    if n_lists is None:
+        n_lists = max(1, int(np.sqrt(n)))
+    n_lists = min(n_lists, n)
+
+    train_idx = np.sort(rng.choice(n, min(n, train_size), replace=False))
+    train = _as_f32(embeddings[train_idx])
+    centroids = _kmeans(train, n_lists, n_iter, rng, spherical=True)
+
+    labels = _assign(embeddings, centroids)
+    ids = np.argsort(labels, kind="stable").astype(np.int32)
+    offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(labels, minlength=len(centroids)))
+
+    index = {"centroids": centroids, "offsets": offsets, "ids": ids}
+
+    if pq_m:
+        if dim % pq_m:
+            raise ValueError(f"pq_m={pq_m} must divide the embedding dim {dim}")
+        sub = dim // pq_m
+        # Quantize residuals from the list centroid, which are far smaller than the vectors
+        residuals = train - centroids[_assign(train, centroids)]
+        codebooks = np.empty((pq_m, PQ_CENTROIDS, sub), dtype=np.float32)
+        for j in range(pq_m):
+            part = residuals[:, j * sub:(j + 1) * sub]
+            cb = _kmeans(part, PQ_CENTROIDS, n_iter, rng, spherical=False)
+            if len(cb) < PQ_CENTROIDS:
+                cb = np.vstack([cb, np.zeros((PQ_CENTROIDS - len(cb), sub), dtype=np.float32)])
+            codebooks[j] = cb
+
+        codes = np.empty((n, pq_m), dtype=np.uint8)
+        for start in range(0, n, CHUNK_ROWS):
+            rows = ids[start:start + CHUNK_ROWS]
+            block = _as_f32(embeddings[rows]) - centroids[labels[rows]]
+            for j in range(pq_m):
+                codes[start:start + len(rows), j] = _assign(
+                    block[:, j * sub:(j + 1) * sub], codebooks[j], metric="l2"
+                )
+        index["codebooks"] = codebooks
+        index["codes"] = codes
+
+    return index
+
+
+def save_ivf(store_dir, index):
+    np.save(os.path.join(store_dir, "ivf_centroids.npy"), index["centroids"])
+    np.save(os.path.join(store_dir, "ivf_offsets.npy"), index["offsets"])
+    np.save(os.path.join(store_dir, "ivf_ids.npy"), index["ids"])
+    pq_m = 0
+    if "codes" in index:
+        pq_m = int(index["codes"].shape[1])
+        np.save(os.path.join(store_dir, "pq_codebooks.npy"), index["codebooks"])
+        np.save(os.path.join(store_dir, "pq_codes.npy"), index["codes"])
+
+    meta = {
+        "lists": int(len(index["centroids"])),
+        "pq_m": pq_m,
+        "dim": int(index["centroids"].shape[1]),
+        "count": int(len(index["ids"])),
+    }
+    with open(os.path.join(store_dir, "ivf.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def ivf_exists(store_dir):
+    return os.path.exists(os.path.join(store_dir, "ivf.json"))
+
+
+class IVFIndex:
+    """Memory-mapped IVF(/PQ) index opened from a QA store directory.
+
+    Pass ``expected_count`` (the store's row count) to refuse an index built
+    for different embeddings; its row ids would point past or at the wrong rows.
+    """
+
+    def __init__(self, store_dir, expected_count=None):
+        with open(os.path.join(store_dir, "ivf.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if expected_count is not None and self.meta.get("count") != expected_count:
+            raise ValueError(f"IVF index in {store_dir} covers {self.meta.get('count')} rows, "
+                             f"the store has {expected_count}")
+        self.centroids = np.load(os.path.join(store_dir, "ivf_centroids.npy"))
+        self.offsets = np.load(os.path.join(store_dir, "ivf_offsets.npy"))
+        self.ids = np.load(os.path.join(store_dir, "ivf_ids.npy"), mmap_mode="r")
+        self.codebooks = self.codes = None
+        if self.meta.get("pq_m"):
+            self.codebooks = np.load(os.path.join(store_dir, "pq_codebooks.npy"))
+            self.codes = np.load(os.path.join(store_dir, "pq_codes.npy"), mmap_mode="r")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _candidates(self, query, nprobe):
+        centroid_scores = self.centroids @ query
+        probes = _top_k(centroid_scores, nprobe)
+        spans = [np.arange(self.offsets[p], self.offsets[p + 1]) for p in probes]
+        if not spans:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        # Per-candidate centroid score, the base that PQ residual scores add to
+        bases = [np.full(len(span), centroid_scores[p], dtype=np.float32) for p, span in zip(probes, spans)]
+        return np.concatenate(spans), np.concatenate(bases)
+
+    def search(self, embeddings, query, top_k=3, nprobe=8, rerank=50):
+        """Return ``(row_ids, scores)`` of the ``top_k`` best rows for ``query``.
+
+        Raising ``nprobe`` scans more lists (higher recall, more work). With PQ,
+        ``rerank`` approximate hits are re-scored exactly before the final cut.
+        """
+        query = _as_f32(query)
+        positions, bases = self._candidates(query, nprobe)
+        if len(positions) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        if self.codes is not None:
+            m, _, sub = self.codebooks.shape
+            # Asymmetric distance: per-subspace dot products with every code word
+            table = np.einsum("mks,ms->mk", self.codebooks, query.reshape(m, sub))
+            codes = np.asarray(self.codes[positions])
+            approx = bases + table[np.arange(m), codes].sum(axis=1)
+            positions = positions[_top_k(approx, max(rerank, top_k))]
+
+        rows = np.sort(np.asarray(self.ids[positions]))
+        scores = _as_f32(embeddings[rows]) @ query
+        top = _top_k(scores, top_k)
+        return rows[top], scores[top]
@@ -0,0 +1,95 @@
+"""Fingerprinted static assets built by ``scripts/build_assets.py``.
+
+Templates call ``asset_url('css/base.css')`` instead of
+``url_for('static', ...)``. When ``app/static/dist/manifest.json`` exists the
+URL points at the hashed copy under ``/assets/``, served with a one-year
+``immutable`` Cache-Control (a new build means a new name), and from the
+precompressed ``.br``/``.gz`` file when the browser accepts it. Without a
+build it falls back to the plain ``/static/`` URL, so development needs no
+extra step.
+
+``picture_sources('img/chatbot.png')`` lists the AVIF/WebP versions of an
+image, for ``<source>`` tags in front of the original ``<img>``.
+"""
+import json
+import logging
+import mimetypes
+import os
+from flask import Blueprint, abort, current_app, request, send_from_directory, url_for
+
+assets_bp = Blueprint("assets", __name__)
+log = logging.getLogger(__name__)
+
+DIST_DIR = "dist"
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Preferred first; matches the suffixes written by the build script
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+IMAGE_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+
+mimetypes.add_type("application/manifest+json", ".webmanifest")
+
+_manifest = None
+
+
+def load_manifest(app):
+    """Read the build manifest; an empty dict when assets were not built."""
+    path = os.path.join(app.static_folder, DIST_DIR, "manifest.json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        log.info("Loaded asset manifest (%d files)", len(manifest))
+        return manifest
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        log.error("Error loading asset manifest: %s", e)
+        return {}
+
+
+def asset_url(filename):
+    entry = _manifest.get(filename) if _manifest else None
+    if entry is None:
+        return url_for("static", filename=filename)
+    return url_for("assets.serve_asset", filename=entry["file"])
+
+
+def picture_sources(filename):
+    """``[(url, mime type)]`` for the modern formats of an image, best first."""
+    entry = _manifest.get(filename) if _manifest else None
+    if not entry:
+        return []
+    formats = entry.get("formats", {})
+    return [
+        (url_for("assets.serve_asset", filename=formats[fmt]), mime)
+        for fmt, mime in IMAGE_TYPES.items() if fmt in formats
+    ]
+
+
+@assets_bp.route("/assets/<path:filename>")
+def serve_asset(filename):
+    dist = os.path.join(current_app.static_folder, DIST_DIR)
+    if not os.path.isfile(os.path.join(dist, filename)):
+        abort(404)
+
+    accepted = request.accept_encodings
+    for encoding, suffix in PRECOMPRESSED:
+        if accepted[encoding] and os.path.isfile(os.path.join(dist, filename + suffix)):
+            response = send_from_directory(dist, filename + suffix, max_age=31536000)
+            # Keep the type of the original file, not application/gzip
+            response.mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            response.headers["Content-Encoding"] = encoding
+            break
+    else:
+        response = send_from_directory(dist, filename, max_age=31536000)
+
+    response.headers["Cache-Control"] = IMMUTABLE
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def init_assets(app):
+    global _manifest
+    _manifest = load_manifest(app)
+    app.register_blueprint(assets_bp)
+    app.jinja_env.globals["asset_url"] = asset_url
+    app.jinja_env.globals["picture_sources"] = picture_sources
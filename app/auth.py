@@ -1,23 +1,23 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from flask_login import login_user, logout_user, login_required, current_user
 from datetime import datetime, timedelta
+import logging
 import secrets
-from app import bcrypt
-from app.models import User
+from app.passwords import hash_password, check_password, needs_rehash, PasswordHasherBusy
+from app.models import User, invalidate_user
 from app.utils import validate_password, send_email
 
 auth_bp = Blueprint('auth', __name__)
 
+log = logging.getLogger(__name__)
+
 @auth_bp.route("/signup", methods=["GET", "POST"])
 def signup():
     if request.method == "POST":
-        print("DEBUG: Signup form submitted")  # Debug line
         username = request.form.get("username", "").strip()
         email = request.form.get("email", "").strip().lower()
         password = request.form.get("password", "")
         
-        print(f"DEBUG: Username: {username}, Email: {email}")  # Debug line
-        
         if not all([username, email, password]):
             flash("All fields are required.", "warning")
             return redirect(url_for("auth.signup"))
@@ -32,7 +32,7 @@ def signup():
                 flash("Username or email already exists.", "danger")
                 return redirect(url_for("auth.signup"))
 
-            hashed = bcrypt.generate_password_hash(password).decode("utf-8")
+            hashed = hash_password(password)
             
             # Generate verification token
             verification_token = secrets.token_urlsafe(32)
@@ -50,7 +50,7 @@ def signup():
             }
             
             result = current_app.users_col.insert_one(user_data)
-            print(f"DEBUG: User inserted with ID: {result.inserted_id}")  # Debug line
+            log.debug("User %s signed up", result.inserted_id)
             
             # Send verification email
             verify_url = url_for('auth.verify_email', token=verification_token, _external=True)
@@ -70,8 +70,11 @@ def signup():
             
             return redirect(url_for("auth.login"))
             
+        except PasswordHasherBusy:
+            flash("We're busy right now. Please try again in a moment.", "warning")
+            return redirect(url_for("auth.signup"))
         except Exception as e:
-            print(f"ERROR in signup: {e}")  # Debug line
+            log.exception("Error in signup: %s", e)
             flash("An error occurred during signup. Please try again.", "danger")
             return redirect(url_for("auth.signup"))
     
@@ -84,11 +87,27 @@ def login():
         password = request.form.get("password", "")
         user_doc = current_app.users_col.find_one({"username": username})
         
-        if user_doc and bcrypt.check_password_hash(user_doc["password"], password):
+        try:
+            password_ok = bool(user_doc) and check_password(user_doc["password"], password)
+        except PasswordHasherBusy:
+            flash("We're busy right now. Please try again in a moment.", "warning")
+            return redirect(url_for("auth.login"))
+        
+        if password_ok:
             if not user_doc.get("verified", False):
                 flash('Please verify your email before logging in.', 'warning')
                 return redirect(url_for("auth.login"))
             
+            # Upgrade hashes made with an older BCRYPT_LOG_ROUNDS while we have the password
+            if needs_rehash(user_doc["password"]):
+                try:
+                    current_app.users_col.update_one(
+                        {"_id": user_doc["_id"]},
+                        {"$set": {"password": hash_password(password)}}
+                    )
+                except Exception as e:
+                    log.error("Error rehashing password for user %s: %s", user_doc["_id"], e)
+            
             # Create User object with the document (using your existing User class)
             user_obj = User(user_doc)
             login_user(user_obj)
@@ -110,13 +129,11 @@ def logout():
 def forgot_password():
     if request.method == 'POST':
         email = request.form['email'].lower()
-        print(f"DEBUG: Password reset requested for email: {email}")
-        
         # Check if email exists
         user = current_app.users_col.find_one({"email": email})
         
         if user:
-            print(f"DEBUG: User found: {user['username']}")
+            log.debug("Password reset requested for user %s", user["_id"])
             # Generate reset token
             reset_token = secrets.token_urlsafe(32)
             expiry = datetime.utcnow() + timedelta(hours=1)
@@ -129,6 +146,7 @@ def forgot_password():
                     "reset_token_expiry": expiry
                 }}
             )
+            invalidate_user(user["_id"])
             
             # Get IP and location info (simplified version)
             ip_address = request.remote_addr
@@ -138,7 +156,6 @@ def forgot_password():
             
             # Send reset email using HTML template
             reset_url = url_for('auth.reset_password', token=reset_token, _external=True)
-            print(f"DEBUG: Reset URL: {reset_url}")
             
             html_body = render_template(
                 'emails/password_reset.html',
@@ -168,18 +185,14 @@ If you didn't request this password reset, please ignore this email.
 Need help? Contact our support team at support@movieapp.com
 """
             
-            print("DEBUG: Templates rendered successfully")
-            
             if send_email(email, "Password Reset Request - Movie App", html_body, text_body):
                 flash('Password reset link sent to your email', 'success')
-                print("DEBUG: Email sent successfully")
             else:
                 flash('Error sending email. Please try again.', 'danger')
-                print("DEBUG: Email sending failed")
+                log.warning("Password reset email for user %s could not be sent", user["_id"])
         else:
             # For security, don't reveal if email exists or not
             flash('If that email exists in our system, a password reset link has been sent.', 'info')
-            print("DEBUG: Email not found in database")
         
         return redirect(url_for('auth.forgot_password'))
     
@@ -210,7 +223,11 @@ def reset_password(token):
             return render_template('reset_password.html')
         
         # Update password and clear reset token
-        hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
+        try:
+            hashed_password = hash_password(password)
+        except PasswordHasherBusy:
+            flash("We're busy right now. Please try again in a moment.", "warning")
+            return render_template('reset_password.html')
         current_app.users_col.update_one(
             {"_id": user["_id"]},
             {"$set": {
@@ -220,6 +237,7 @@ def reset_password(token):
                 "verified": True  # AUTO-VERIFY AFTER PASSWORD RESET
             }}
         )
+        invalidate_user(user["_id"])
         
         flash('Password reset successfully. You can now login.', 'success')
         return redirect(url_for('auth.login'))
@@ -235,12 +253,14 @@ def verify_email(token):
         if datetime.utcnow() - user.get("created_at", datetime.utcnow()) > timedelta(hours=24):
             flash('Verification link has expired. Please sign up again.', 'danger')
             current_app.users_col.delete_one({"_id": user["_id"]})  # Remove unverified user
+            invalidate_user(user["_id"])
             return redirect(url_for("auth.signup"))
         
         current_app.users_col.update_one(
             {"_id": user["_id"]},
             {"$set": {"verified": True, "verification_token": None}}
         )
+        invalidate_user(user["_id"])
         flash('Email verified successfully! You can now login.', 'success')
     else:
         flash('Invalid verification token', 'danger')
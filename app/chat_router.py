@@ -0,0 +1,108 @@
+"""Single-pass intent routing for chat messages.
+
+Greetings, "movies like X" phrases, recommendation keywords and genre words
+are compiled once into one regular expression with named groups. A single
+left-to-right ``finditer`` scan over the message tells ``chat()`` which
+handler to use, the movie-name span (if any) and the genres mentioned,
+instead of looping over substring lists and trying regexes one by one.
+"""
+import re
+from collections import namedtuple
+
+# Predefined greetings
+GREETINGS = {
+    "hello": "👋 Hi there! How can I help you with movies today?",
+    "hi": "😊 Hello! Looking for a movie recommendation?",
+    "hey": "👋 Hey! Ask me about movies, genres, or actors.",
+    "how are you": "😃 I'm doing great, thanks! Ready to recommend you some movies 🎬",
+    "thanks": "🙏 You're welcome! Happy to help with your movie search.",
+    "thank you": "🙏 You're welcome! Happy to help with your movie search."
+}
+
+# Phrases followed by a movie name ("movies like X", "what about X", ...)
+MOVIE_TRIGGERS = [
+    r"recommend\w*(?:\s+\w+)*?\s+like",
+    r"suggest\w*(?:\s+\w+)*?\s+like",
+    r"movies like",
+    r"similar to",
+    r"like",
+    r"recommendations for",
+    r"suggestions for",
+    r"what about",
+    r"how about",
+]
+
+# Phrases that make a message a recommendation request on their own
+RECOMMEND_KEYWORDS = [
+    "recommend", "suggest", "what should i watch", "movies like", "i want movies like",
+    "similar to", "good movies", "best movies", "what to watch", "something similar to",
+    "like", "similar movies", "suggestion", "how about", "what about", "something like",
+    "give me some movie recommendations",
+]
+
+# Keyword in the message -> TMDB genre name
+GENRE_KEYWORDS = {
+    "action": "Action", "comedy": "Comedy", "drama": "Drama",
+    "horror": "Horror", "sci-fi": "Science Fiction", "romantic": "Romance",
+    "thriller": "Thriller", "adventure": "Adventure", "animation": "Animation",
+}
+
+Route = namedtuple("Route", "intent greeting movie genres")
+
+
+def _alternation(phrases):
+    # Longest first so "thank you" wins over "thanks"-style prefixes
+    return "|".join(sorted(phrases, key=len, reverse=True))
+
+
+def compile_router():
+    triggers = _alternation(MOVIE_TRIGGERS)
+    # A movie name runs to the end of the sentence and may not contain another
+    # trigger, so "what about something similar to X" yields "X"
+    movie_span = rf"(?:(?!\b(?:{triggers})\b)[^.?!])+"
+    escaped = lambda words: _alternation([re.escape(w) for w in words])
+    return re.compile(
+        rf"^(?P<greeting>{escaped(GREETINGS)})(?=\s|$)"
+        rf"|\b(?:{triggers})\s+(?P<movie>{movie_span})(?=[.?!]|$)"
+        rf"|(?P<genre>{escaped(GENRE_KEYWORDS)})"
+        # Zero-width, so a keyword never swallows the start of a movie trigger
+        rf"|\b(?=(?P<recommend>{escaped(RECOMMEND_KEYWORDS)}))",
+        re.IGNORECASE,
+    )
+
+
+ROUTER = compile_router()
+
+
+def route(query):
+    """Classify a chat message in one scan.
+
+    ``intent`` is ``"greeting"``, ``"recommend"`` or ``"other"``; ``movie`` is the
+    raw movie-name span and ``genres`` the TMDB genre names mentioned.
+    """
+    greeting = movie = None
+    recommend = False
+    genres = []
+    for match in ROUTER.finditer(query):
+        kind = match.lastgroup
+        if kind == "greeting":
+            greeting = match.group("greeting").lower()
+            break
+        if kind == "movie":
+            movie = match.group("movie").strip()
+            recommend = True
+            if movie.lower() in GENRE_KEYWORDS:
+                # "how about horror" names a genre, not a movie
+                genres.append(GENRE_KEYWORDS[movie.lower()])
+                movie = None
+        elif kind == "genre":
+            genres.append(GENRE_KEYWORDS[match.group("genre").lower()])
+        else:
+            recommend = True
+
+    genres = list(dict.fromkeys(genres))
+    if greeting:
+        return Route("greeting", greeting, None, [])
+    if recommend:
+        return Route("recommend", None, movie, genres)
+    return Route("other", None, None, genres)
@@ -1,82 +1,108 @@
 import os
+import logging
 import pickle
-import torch
+import time
+import numpy as np
 import pandas as pd
-from flask import Blueprint, request, jsonify, current_app
-from sentence_transformers import SentenceTransformer, util
-from deep_translator import GoogleTranslator
-from langdetect import detect, DetectorFactory
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from sentence_transformers import SentenceTransformer
 from datetime import datetime
 import re
-import time
+import json
 import random
 from flask_login import current_user
 from bson import ObjectId  
 from app.tmdb import search_movie, make_card_from_tmdb_obj, tmdb_similar
-from app.utils import linear_kernel
-from app.recommendation import recommend_from_dataset, recommend_fallback_tmdb
-
-# Set deterministic language detection
-DetectorFactory.seed = 0
+from app.utils import linear_kernel, find_title_in_text, rows_with_facets
+from app.chat_router import route, GREETINGS
+from app.curated import get_curated, get_genre_list
+from app.intents import IntentClassifier, render_answer
+from app.translation import get_translation_service
+from app.conversations import (save_conversation, conversation_summary, conversation_page, list_conversations,
+                               clear_conversation, delete_all_conversations,
+                               delete_conversation as delete_conversation_record)
+from app.recommendation import (recommend_from_dataset, recommend_fallback_tmdb, resolve_movie, ResolvedMovie,
+                                similar_dataset_rows, iter_enriched_rows, iter_fallback_tmdb)
+from app.qa_store import load_qa_store, store_exists
+from app.http_cache import cached_response
+from app.ann import IVFIndex, ivf_exists, exact_search
+from app.timing import span, timed
+from app.metrics import observe_encode, record_load_time
+from config import Config
 
 # Set offline mode to prevent internet requests
 os.environ['TRANSFORMERS_OFFLINE'] = '1'
 
 chatbot_bp = Blueprint("chatbot", __name__)
+log = logging.getLogger(__name__)
+
+CONVERSATION_LIST_PAGE_SIZE = 20
 
 # Load model and data once
+load_start = time.perf_counter()
 try:
     # Try to load from local cache without internet
     model = SentenceTransformer('all-MiniLM-L6-v2', local_files_only=True)
-    print("DEBUG: Chatbot model loaded successfully from cache")
+    log.info("Chatbot model loaded successfully from cache")
 except Exception as e:
-    print(f"ERROR: Failed to load model from cache: {e}")
+    log.error("Failed to load model from cache: %s", e)
     # Fallback to online download
     os.environ['TRANSFORMERS_OFFLINE'] = '0'
     try:
         model = SentenceTransformer('all-MiniLM-L6-v2')
-        print("DEBUG: Chatbot model downloaded successfully")
+        log.info("Chatbot model downloaded successfully")
     except Exception as e2:
-        print(f"ERROR: Failed to download model: {e2}")
+        log.error("Failed to download model: %s", e2)
         model = None
+if model is not None:
+    record_load_time("sentence_model", time.perf_counter() - load_start)
 
 # Initialize variables
-questions, answers, qa_embeddings, qa_df = None, None, None, None
+questions, answers, qa_embeddings, qa_index = None, None, None, None
 
+load_start = time.perf_counter()
 try:
-    # Load everything from the single pickle file
-    with open("chatbot_model/qa_dataset.pkl", 'rb') as f:
-        model_data = pickle.load(f)
-    
-    # Extract components from the single file
-    questions = model_data['questions']
-    answers = model_data['answers']
-    qa_embeddings = model_data['embeddings']
-    
-    # Create a DataFrame for compatibility with existing code
-    qa_df = pd.DataFrame({
-        'question': questions,
-        'answer': answers
-    })
+    if store_exists(Config.QA_STORE_PATH):
+        # Memory-mapped store: near-instant to open and shared between workers
+        questions, answers, qa_embeddings, qa_meta = load_qa_store(Config.QA_STORE_PATH)
+        log.info("QA store opened from %s (%s)", Config.QA_STORE_PATH, qa_meta["dtype"])
+        if Config.QA_ANN_ENABLED and ivf_exists(Config.QA_STORE_PATH):
+            try:
+                qa_index = IVFIndex(Config.QA_STORE_PATH, expected_count=qa_meta["count"])
+                log.info("ANN index loaded (%s lists, pq_m=%s)", qa_index.meta["lists"], qa_index.meta["pq_m"])
+            except (ValueError, OSError) as e:
+                log.warning("Ignoring ANN index, using exact search: %s", e)
+    else:
+        # Legacy single pickle file
+        with open(Config.QA_DATASET_PATH, 'rb') as f:
+            model_data = pickle.load(f)
+        
+        questions = model_data['questions']
+        answers = model_data['answers']
+        embeddings = model_data['embeddings']
+        if hasattr(embeddings, 'cpu'):
+            embeddings = embeddings.cpu().numpy()
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        qa_embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        log.warning("Loaded legacy pickle %s; run scripts/generate_qa_embeddings.py --from-pickle to convert it",
+                    Config.QA_DATASET_PATH)
     
-    print("DEBUG: QA dataset and embeddings loaded successfully")
-    print(f"DEBUG: Loaded {len(questions)} Q&A pairs")
-    print(f"DEBUG: Embeddings shape: {qa_embeddings.shape}")
+    log.info("Loaded %d Q&A pairs, embeddings shape %s", len(questions), qa_embeddings.shape)
+    record_load_time("qa_store", time.perf_counter() - load_start)
     
 except Exception as e:
-    print(f"ERROR: Failed to load QA dataset: {e}")
-    questions, answers, qa_embeddings, qa_df = None, None, None, None
+    log.error("Failed to load QA dataset: %s", e)
+    questions, answers, qa_embeddings, qa_index = None, None, None, None
 
 
-# Predefined greetings
-GREETINGS = {
-    "hello": "👋 Hi there! How can I help you with movies today?",
-    "hi": "😊 Hello! Looking for a movie recommendation?",
-    "hey": "👋 Hey! Ask me about movies, genres, or actors.",
-    "how are you": "😃 I'm doing great, thanks! Ready to recommend you some movies 🎬",
-    "thanks": "🙏 You're welcome! Happy to help with your movie search.",
-    "thank you": "🙏 You're welcome! Happy to help with your movie search."
-}
+load_start = time.perf_counter()
+try:
+    intent_classifier = IntentClassifier(model)
+    record_load_time("intent_classifier", time.perf_counter() - load_start)
+except Exception as e:
+    log.error("Failed to build intent classifier: %s", e)
+    intent_classifier = None
+
 
 # Fallback responses if model loading fails
 FALLBACK_RESPONSES = [
@@ -90,55 +116,26 @@ FALLBACK_RESPONSES = [
     "Check out 'Parasite' if you want something thought-provoking and award-winning."
 ]
 
-RECOMMENDATION_PATTERNS = [
-    'recommend', 'suggest', 'what should i watch', 'movies like', 'recommend something like','i want something similar to',
-    'similar to', 'good movies', 'best movies', 'what to watch','suggest for me something like',
-    'like', 'similar movies', 'suggestion', 'how about', 'what about','i want movies like'
-]
-
-def extract_movie_from_query(query):
-    """Improved movie name extraction that handles your recommendation system"""
-    patterns = [
-        r'recommend.*like (.+?)(?:\.|\?|$)', 
-        r'suggest.*like (.+?)(?:\.|\?|$)',
-        r'movies like (.+?)(?:\.|\?|$)',
-        r'similar to (.+?)(?:\.|\?|$)',
-        r'like (.+?)(?:\.|\?|$)',
-        r'recommendations for (.+?)(?:\.|\?|$)',
-        r'suggestions for (.+?)(?:\.|\?|$)',
-        r'what about (.+?)(?:\.|\?|$)',
-        r'how about (.+?)(?:\.|\?|$)'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, query, re.IGNORECASE)
-        if match:
-            movie_name = match.group(1).strip()
-            movie_name = clean_movie_name(movie_name)
-            
-            # Verify the movie exists in your system
-            if verify_movie_exists(movie_name):
-                return movie_name
+def extract_movie_from_query(query, movie_span=None):
+    """Pull the movie name out of a recommendation request and verify it exists"""
+    if movie_span is None:
+        movie_span = route(query).movie
+    if not movie_span:
+        return None
     
-    return None
+    movie_name = clean_movie_name(movie_span)
+    return verify_movie_exists(movie_name) if movie_name else None
 
 def verify_movie_exists(movie_name):
-    """Check if movie exists in either dataset or TMDB"""
+    """Resolve the movie in the dataset or TMDB; returns a ResolvedMovie or None.
+    
+    The local title index is checked first so known titles never hit the network.
+    """
     try:
-        # Check if in dataset
-        from app.utils import df
-        if df is not None and movie_name.lower() in set(df["title_clean"].values):
-            return True
-        
-        # Check if in TMDB
-        tmdb_result = search_movie(movie_name)
-        if tmdb_result:
-            return True
-            
+        return resolve_movie(movie_name)
     except Exception as e:
-        print(f"ERROR verifying movie: {e}")
-    
-    return False
+        log.exception("Error verifying movie: %s", e)
+    return None
 
 def clean_movie_name(movie_name):
     """Clean movie names for your recommendation system"""
@@ -155,90 +152,108 @@ def clean_movie_name(movie_name):
     
     return movie_name.strip()
 
-def get_recommendations_for_movie(movie_name):
-    """Get recommendations using your existing system but format for chat"""
+def get_recommendations_for_movie(movie):
+    """Get recommendations using your existing system but format for chat
+    
+    ``movie`` is the ResolvedMovie for this message (or a plain name, which is
+    resolved here once) and is handed to both recommenders.
+    """
+    movie_name = str(movie)
     try:
-        print(f"DEBUG: Getting recommendations for: {movie_name}")
+        if not isinstance(movie, ResolvedMovie):
+            movie = resolve_movie(movie_name) or ResolvedMovie(movie_name, tmdb=None)
+        log.debug("Getting recommendations for: %r", movie)
         
         # First try your dataset-based recommendations
-        recommendations = recommend_from_dataset(movie_name, top_n=5, country="US")
+        recommendations = recommend_from_dataset(movie, top_n=5, country="US")
         
         if not recommendations:
             # If not found in dataset, try TMDB fallback
-            print(f"DEBUG: Movie not in dataset, trying TMDB fallback")
-            recommendations = recommend_fallback_tmdb(movie_name, top_n=5, country="US")
+            log.debug("%s not in dataset, trying TMDB fallback", movie)
+            recommendations = recommend_fallback_tmdb(movie, top_n=5, country="US")
         
         if recommendations:
-            return format_recommendations_for_chat(recommendations, movie_name)
+            return format_recommendations_for_chat(recommendations, movie.title)
         else:
             return f"I couldn't find specific recommendations for *{movie_name}*. {get_general_recommendations()}"
             
     except Exception as e:
-        print(f"ERROR getting recommendations: {e}")
+        log.exception("Error getting recommendations: %s", e)
         return f"🎬 I'm having trouble finding recommendations for *{movie_name}*. {get_general_recommendations()}"
 
+RECOMMENDATIONS_FOOTER = "\nWould you like more details about any of these? 😊"
+
+def recommendations_header(original_movie):
+    return f"🎬 Based on *{original_movie}*, I recommend:\n\n"
+
+def format_recommendation_line(i, movie):
+    """One numbered chat entry for a movie card"""
+    title = movie.get('title', 'Unknown Movie')
+    year = movie.get('release_date', '')[:4] if movie.get('release_date') else ''
+    rating = movie.get('vote_average', movie.get('rating', ''))
+    overview = movie.get('overview', '')
+    
+    line = f"**{i}. {title}**"
+    if year:
+        line += f" ({year})"
+    if rating:
+        line += f" ⭐ {rating}/10"
+    line += "\n"
+    
+    # Add brief description if available
+    if overview and len(overview) > 0:
+        brief_overview = overview[:100] + "..." if len(overview) > 100 else overview
+        line += f"   *{brief_overview}*\n"
+    
+    return line + "\n"
+
 def format_recommendations_for_chat(recommendations, original_movie):
     """Format movie cards into a nice chat response"""
     if not recommendations:
         return f"I couldn't find recommendations for *{original_movie}* 😢"
     
-    response = f"🎬 Based on *{original_movie.title()}*, I recommend:\n\n"
-    
+    response = recommendations_header(original_movie)
     for i, movie in enumerate(recommendations, 1):
-        title = movie.get('title', 'Unknown Movie')
-        year = movie.get('release_date', '')[:4] if movie.get('release_date') else ''
-        rating = movie.get('vote_average', '')
-        overview = movie.get('overview', '')
-        
-        response += f"**{i}. {title}**"
-        if year:
-            response += f" ({year})"
-        if rating:
-            response += f" ⭐ {rating}/10"
-        response += "\n"
-        
-        # Add brief description if available
-        if overview and len(overview) > 0:
-            brief_overview = overview[:100] + "..." if len(overview) > 100 else overview
-            response += f"   *{brief_overview}*\n"
-        
-        response += "\n"
+        response += format_recommendation_line(i, movie)
     
-    response += "\nWould you like more details about any of these? 😊"
+    response += RECOMMENDATIONS_FOOTER
     return response
 
-def get_recommendations_by_genre(query):
-    """Get genre-based recommendations using your system"""
-    genre_map = {
-        'action': "Action", 'comedy': "Comedy", 'drama': "Drama",
-        'horror': "Horror", 'sci-fi': "Science Fiction", 'romantic': "Romance",
-        'thriller': "Thriller", 'adventure': "Adventure", 'animation': "Animation"
-    }
-    
-    query_lower = query.lower()
-    for keyword, genre in genre_map.items():
-        if keyword in query_lower:
-            # Use a popular movie in that genre as a seed
-            seed_movies = {
-                'action': "The Dark Knight",
-                'comedy': "Superbad", 
-                'drama': "The Shawshank Redemption",
-                'horror': "The Shining",
-                'sci-fi': "Inception",
-                'romantic': "The Notebook",
-                'thriller': "Se7en",
-                'adventure': "Indiana Jones",
-                'animation': "Toy Story"
-            }
-            
-            seed_movie = seed_movies.get(keyword, "The Shawshank Redemption")
-            recommendations = recommend_fallback_tmdb(seed_movie, top_n=5, country="US")
-            
-            if recommendations:
-                return format_genre_recommendations(recommendations, genre)
-            else:
-                return f"🎬 Top {genre} Movies:\n• Check out popular {genre} films on TMDB!\n\nOr try asking for a specific {genre} movie. 😊"
+def dataset_genre_movies(genres, limit=5):
+    """Most popular dataset movies having all ``genres``, from the facet index"""
+    from app import utils
     
+    if utils.df is None:
+        return []
+    movies = []
+    for pos in rows_with_facets(genres, limit=limit):
+        row = utils.df.iloc[pos]
+        release = row.get('release_date')
+        movies.append({
+            'title': row['title'],
+            'release_date': str(release) if pd.notna(release) else '',
+            'vote_average': row.get('vote_average') if pd.notna(row.get('vote_average')) else '',
+        })
+    return movies
+
+def get_recommendations_by_genre(query, genres=None):
+    """Get genre-based recommendations from the local catalog, then the materialized lists"""
+    if genres is None:
+        genres = route(query).genres
+    
+    # All genres at once ("sci-fi thriller"), answered from the in-memory index
+    recommendations = dataset_genre_movies(genres, limit=5)
+    if recommendations:
+        return format_genre_recommendations(recommendations, " ".join(genres))
+    
+    for genre in genres:
+        recommendations = get_genre_list(genre, limit=5)
+        if recommendations:
+            return format_genre_recommendations(recommendations, genre)
+    
+    if genres:
+        genre = genres[0]
+        return f"🎬 Top {genre} Movies:\n• Check out popular {genre} films on TMDB!\n\nOr try asking for a specific {genre} movie. 😊"
     return get_general_recommendations()
 
 def format_genre_recommendations(recommendations, genre):
@@ -260,157 +275,107 @@ def format_genre_recommendations(recommendations, genre):
     return response
 
 def get_general_recommendations():
-    """Get general recommendations using popular movies"""
-    popular_movies = ["The Dark Knight", "Inception", "The Shawshank Redemption", "Pulp Fiction", "Forrest Gump"]
-    
+    """Get general recommendations from the materialized curated list"""
     response = "🎬 Here are some highly recommended movies:\n\n"
     
-    for i, movie in enumerate(popular_movies, 1):
-        # Get details for each popular movie
-        movie_data = search_movie(movie)
-        if movie_data:
-            title = movie_data.get('title', movie)
-            year = movie_data.get('release_date', '')[:4] if movie_data.get('release_date') else ''
-            rating = movie_data.get('vote_average', '')
-            
-            response += f"**{i}. {title}**"
-            if year:
-                response += f" ({year})"
-            if rating:
-                response += f" ⭐ {rating}/10"
-            response += "\n"
-        else:
-            response += f"**{i}. {movie}**\n"
+    for i, movie_data in enumerate(get_curated(), 1):
+        title = movie_data.get('title')
+        year = movie_data.get('release_date', '')[:4] if movie_data.get('release_date') else ''
+        rating = movie_data.get('vote_average', '')
+        
+        response += f"**{i}. {title}**"
+        if year:
+            response += f" ({year})"
+        if rating:
+            response += f" ⭐ {rating}/10"
+        response += "\n"
     
     response += "\nWant recommendations based on a specific movie or genre? 😊"
     return response
 
 
-def handle_recommendation_request(query):
+def handle_recommendation_request(query, chat_route=None):
     """Handle movie recommendation requests"""
-    query_lower = query.lower()
+    if chat_route is None:
+        chat_route = route(query)
     
-    # Extract movie name for "like X" queries
-    movie_name = extract_movie_from_query(query)
+    # Resolve the "like X" movie once; it is passed down as-is from here
+    movie = extract_movie_from_query(query, chat_route.movie)
     
-    if movie_name:
-        return get_recommendations_for_movie(movie_name)
-    elif any(genre in query_lower for genre in ['action', 'comedy', 'drama', 'horror', 'sci-fi', 'romantic', 'thriller', 'adventure', 'animation']):
-        return get_recommendations_by_genre(query)
+    if movie:
+        return get_recommendations_for_movie(movie)
+    elif chat_route.genres:
+        return get_recommendations_by_genre(query, chat_route.genres)
     else:
         return get_general_recommendations()
 
-def save_conversation(user_id, user_message, bot_response):
-    """Save conversation to database"""
-    try:
-        from datetime import datetime
-        
-        # Make sure the collection exists
-        if not hasattr(current_app, 'conversations_col'):
-            print("ERROR: conversations_col not found in app")
-            return False
-        
-        print(f"DEBUG: Saving conversation for user {user_id}")
-        print(f"DEBUG: User message: {user_message}")
-        print(f"DEBUG: Bot response: {bot_response}")
-        
-        # Get or create today's conversation
-        today = datetime.now().date()
-        start_of_day = datetime.combine(today, datetime.min.time())
-        
-        conversation = current_app.conversations_col.find_one({
-            "user_id": user_id,
-            "created_at": {"$gte": start_of_day}
-        })
-        
-        if conversation:
-            print(f"DEBUG: Appending to existing conversation {conversation['_id']}")
-            # Append to existing conversation
-            result = current_app.conversations_col.update_one(
-                {"_id": conversation["_id"]},
-                {"$push": {"messages": {
-                    "user": user_message,
-                    "bot": bot_response,
-                    "timestamp": datetime.now()
-                }},
-                 "$set": {"updated_at": datetime.now()}}
-            )
-            print(f"DEBUG: Update result - matched: {result.matched_count}, modified: {result.modified_count}")
-            
-        else:
-            print("DEBUG: Creating new conversation")
-            # Create new conversation
-            conversation_data = {
-                "user_id": user_id,
-                "messages": [{
-                    "user": user_message,
-                    "bot": bot_response,
-                    "timestamp": datetime.now()
-                }],
-                "created_at": datetime.now(),
-                "updated_at": datetime.now()
-            }
-            result = current_app.conversations_col.insert_one(conversation_data)
-            print(f"DEBUG: New conversation created with ID: {result.inserted_id}")
-            
-        # Verify the conversation was saved
-        saved_conversation = current_app.conversations_col.find_one({
-            "user_id": user_id,
-            "created_at": {"$gte": start_of_day}
-        })
-        
-        if saved_conversation:
-            print(f"DEBUG: Successfully verified conversation save - messages: {len(saved_conversation.get('messages', []))}")
-        else:
-            print("DEBUG: ERROR - Could not verify conversation was saved")
-            
-        return True
-    except Exception as e:
-        print(f"ERROR saving conversation: {e}")
-        return False
-
-def safe_translate(text, source="auto", target="en", max_retries=2):
-    """Safe translation with retries"""
-    for attempt in range(max_retries):
-        try:
-            translated = GoogleTranslator(source=source, target=target).translate(text)
-            return translated, source
-        except Exception as e:
-            print(f"Translation attempt {attempt + 1} failed: {e}")
-            time.sleep(1)
-    
-    return text, "en"  # Fallback to English
+@timed("translate")
+def safe_translate(text, source="auto", target="en"):
+    """Translate through the cached, time-bounded translation service"""
+    service = get_translation_service()
+    if source == "auto":
+        source = service.detect(text)
+    return service.translate(text, source, target), source
 
 def detect_and_translate(text, target_lang="en"):
     """Language detection and translation"""
     try:
-        if target_lang == "en" and re.match(r'^[a-zA-Z0-9\s\.,!?@#$%^&*()_+-=]*$', text):
-            return text, "en"
-        
-        translated, detected_lang = safe_translate(text, target=target_lang)
-        print(f"DEBUG: Translated '{text}' to '{translated}' (detected: {detected_lang})")
+        service = get_translation_service()
+        if target_lang == "en":
+            with span("translate"):
+                translated, detected_lang = service.to_english(text)
+        else:
+            translated, detected_lang = safe_translate(text, target=target_lang)
+        if detected_lang != "en":
+            log.debug("Translated '%s' to '%s' (detected: %s)", text, translated, detected_lang)
         return translated, detected_lang
         
     except Exception as e:
-        print(f"ERROR in language detection/translation: {e}")
+        log.error("Error in language detection/translation: %s", e)
         return text, "en"
 
+def answer_movie_question(query):
+    """Answer plot/rating/popularity questions about a catalog movie, or None."""
+    from app import utils
+    
+    if utils.df is None or intent_classifier is None:
+        return None
+    
+    row, rest = find_title_in_text(query)
+    if row is None:
+        return None
+    
+    with span("intent"):
+        intent, score = intent_classifier.classify(rest)
+    log.debug("Title '%s', intent %s (%.2f)", utils.df.iloc[row]["title"], intent, score)
+    if intent is None:
+        return None
+    return render_answer(intent, utils.df.iloc[row])
+
 def get_best_match(user_query, top_k=3):
     """Find the most similar Q&A pair using semantic search."""
     if model is None or qa_embeddings is None:
         return []
         
     try:
-        query_embedding = model.encode(user_query, convert_to_tensor=True)
-        scores = util.cos_sim(query_embedding, qa_embeddings)[0]
-        top_results = torch.topk(scores, k=top_k)
-        top_indices = top_results.indices.tolist()
-        top_scores = top_results.values.tolist()
+        with span("encode"):
+            start = time.perf_counter()
+            query_embedding = model.encode(user_query, convert_to_numpy=True, normalize_embeddings=True)
+            observe_encode("qa", 1, time.perf_counter() - start)
+        
+        with span("qa_search"):
+            if qa_index is not None:
+                top_indices, top_scores = qa_index.search(
+                    qa_embeddings, query_embedding, top_k=top_k,
+                    nprobe=Config.QA_ANN_NPROBE, rerank=Config.QA_ANN_RERANK
+                )
+            else:
+                top_indices, top_scores = exact_search(qa_embeddings, query_embedding, top_k=top_k)
         
         # Return both indices and scores
-        return list(zip(top_indices, top_scores))
+        return [(int(i), float(s)) for i, s in zip(top_indices, top_scores)]
     except Exception as e:
-        print(f"ERROR in get_best_match: {e}")
+        log.exception("Error in get_best_match: %s", e)
         return []
 
 
@@ -422,47 +387,47 @@ def chat():
     if not user_query:
         return jsonify({"reply": "Please type a message."})
 
-    print(f"DEBUG: User query: {user_query}")
-
-    # Step 1: Check if it's a greeting (only exact matches)
-    user_query_lower = user_query.lower()
-    for greet, response in GREETINGS.items():
-        if user_query_lower == greet or user_query_lower.startswith(greet + ' '):
-            if current_user.is_authenticated:
-                save_conversation(str(current_user.id), user_query, response)
-            return jsonify({"reply": response})
-
-    # Step 2: Check for recommendation patterns
-    recommendation_patterns = [
-        'recommend', 'suggest', 'what should i watch', 'movies like', 'i want movies like',
-        'similar to', 'good movies', 'best movies', 'what to watch','something similar to',
-        'like', 'similar movies', 'suggestion', 'how about', 'what about','something like','give me some movie recommendations'
-    ]
-    
-    if any(pattern in user_query_lower for pattern in recommendation_patterns):
-        response = handle_recommendation_request(user_query)
+    log.debug("User query: %s", user_query)
+
+    # Step 1-2: greeting / recommendation routing in a single pass
+    chat_route = route(user_query)
+    
+    if chat_route.intent == "greeting":
+        response = GREETINGS[chat_route.greeting]
         if current_user.is_authenticated:
             save_conversation(str(current_user.id), user_query, response)
         return jsonify({"reply": response})
-        
 
-    # Step 3: If models failed to load, use fallback
-    if model is None or qa_embeddings is None or questions is None:
-        response = random.choice(FALLBACK_RESPONSES)
+    if chat_route.intent == "recommend":
+        response = handle_recommendation_request(user_query, chat_route)
         if current_user.is_authenticated:
             save_conversation(str(current_user.id), user_query, response)
         return jsonify({"reply": response})
+        
+
+    response = answer_question(user_query)
+
+    # Save conversation if user is logged in
+    if current_user.is_authenticated:
+        save_conversation(str(current_user.id), user_query, response)
 
-    # Step 4: detect language + translate to English for processing
+    return jsonify({"reply": response})
+
+def answer_question(user_query):
+    """Reply to anything that is not a greeting or a recommendation request"""
+    # Step 3: detect language + translate to English for processing
     translated_query, original_lang = detect_and_translate(user_query)
-    print(f"DEBUG: Translated query: {translated_query}, Original lang: {original_lang}")
 
-    # Step 5: semantic search with better matching
-    results = get_best_match(translated_query, top_k=3)  # Get top 3 matches
-    
-    if not results:
-        response = "I'm not sure about that. Try asking me about specific movies or recommendations!"
-    else:
+    # Step 4: catalog title + intent, answered live from the dataset
+    response = answer_movie_question(translated_query)
+
+    # Step 5: semantic search over the QA store for anything else
+    if response is None and (qa_embeddings is None or questions is None):
+        response = random.choice(FALLBACK_RESPONSES)
+    elif response is None:
+        response = handle_unknown_query(user_query)
+        results = get_best_match(translated_query, top_k=3)  # Get top 3 matches
+        
         # Find the best match with decent score
         best_match = None
         for idx, score in results:
@@ -470,38 +435,99 @@ def chat():
                 best_match = (idx, score)
                 break
         
-        
         if best_match:
             idx, score = best_match
             try:
                 # Make sure the index is valid using the questions list
                 if 0 <= idx < len(questions):
                     matched_question = questions[idx]
-                    answer = answers[idx]
-                    response = answer
-                    print(f"DEBUG: Best match - Q: {matched_question}, Score: {score:.4f}")
+                    response = answers[idx]
+                    log.debug("Best match - Q: %s, Score: %.4f", matched_question, score)
                 else:
-                    print(f"DEBUG: Invalid index {idx}, questions length: {len(questions)}")
-                    response = handle_unknown_query(user_query)
+                    log.warning("Invalid index %d, questions length: %d", idx, len(questions))
             except Exception as e:
-                print(f"ERROR accessing QA data: {e}")
+                log.error("Error accessing QA data: %s", e)
                 # Fallback to simple response
                 response = "I can help you with movie information! Try asking about specific movies."
 
-
-
     # Step 6: translate back if needed
     if original_lang != "en":
         try:
             response, _ = safe_translate(response, source="en", target=original_lang)
         except Exception as e:
-            print(f"ERROR translating response back: {e}")
+            log.error("Error translating response back: %s", e)
 
-    # Save conversation if user is logged in
-    if current_user.is_authenticated:
-        save_conversation(str(current_user.id), user_query, response)
+    return response
 
-    return jsonify({"reply": response})
+def sse_event(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def iter_movie_recommendation_reply(movie):
+    """Yield the lines of a "movies like X" reply, each as soon as its card is enriched"""
+    yield recommendations_header(movie.title)
+    
+    rows = similar_dataset_rows(movie, top_n=5)
+    cards = iter_enriched_rows(rows, "US") if rows else iter_fallback_tmdb(movie, top_n=5, country="US")
+    count = 0
+    for count, card in enumerate(cards, 1):
+        yield format_recommendation_line(count, card)
+    
+    if count:
+        yield RECOMMENDATIONS_FOOTER
+    else:
+        yield f"I couldn't find specific recommendations for *{movie.title}*. {get_general_recommendations()}"
+
+@chatbot_bp.route("/chat/stream", methods=["POST"])
+def chat_stream():
+    """Streaming variant of /chat: Server-Sent Events with the intent first,
+    then each line of the reply as soon as it is ready (one per enriched movie)"""
+    data = request.get_json(silent=True) or {}
+    user_query = data.get("message", "").strip().lower()
+    user_id = str(current_user.id) if current_user.is_authenticated else None
+    
+    def generate():
+        if not user_query:
+            yield sse_event("done", {"reply": "Please type a message."})
+            return
+        
+        parts = []
+        def line(text):
+            parts.append(text)
+            return sse_event("line", {"text": text})
+        
+        chat_route = route(user_query)
+        yield sse_event("intent", {"intent": chat_route.intent})
+        
+        try:
+            if chat_route.intent == "greeting":
+                yield line(GREETINGS[chat_route.greeting])
+            elif chat_route.intent == "recommend":
+                movie = extract_movie_from_query(user_query, chat_route.movie)
+                # The movie is resolved once; a miss goes straight to the genre/general lists
+                if movie:
+                    for text in iter_movie_recommendation_reply(movie):
+                        yield line(text)
+                elif chat_route.genres:
+                    yield line(get_recommendations_by_genre(user_query, chat_route.genres))
+                else:
+                    yield line(get_general_recommendations())
+            else:
+                yield line(answer_question(user_query))
+        except Exception as e:
+            log.exception("Error streaming chat reply: %s", e)
+            yield line("\n🎬 Sorry, something went wrong while finding movies.")
+        
+        reply = "".join(parts)
+        if user_id:
+            save_conversation(user_id, user_query, reply)
+        yield sse_event("done", {"reply": reply})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 def handle_unknown_query(query):
     """Handle queries that don't match anything"""
@@ -515,33 +541,43 @@ def handle_unknown_query(query):
         return "I'm not sure I understand. Try asking about specific movies, ratings, popularity, or recommendations!"
 
 @chatbot_bp.route("/conversations")
+@cached_response(private=True)
 def get_conversations():
-    """API endpoint - returns JSON conversation list"""
+    """API endpoint - returns one page of the JSON conversation list (``?after=<next_cursor>``)"""
     if not current_user.is_authenticated:
         return jsonify({"error": "Not authenticated"}), 401
     
     try:
-        conversations = current_app.conversations_col.find(
-            {"user_id": str(current_user.id)}
-        ).sort("updated_at", -1)
+        limit = min(request.args.get("limit", CONVERSATION_LIST_PAGE_SIZE, type=int), 100)
+        try:
+            conversations, next_cursor = list_conversations(
+                str(current_user.id), request.args.get("after"), max(limit, 1)
+            )
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
         
         conversation_list = []
         for conv in conversations:
+            last = conv.get("last_message")
             conversation_list.append({
                 "id": str(conv["_id"]),
                 "date": conv["created_at"].strftime("%Y-%m-%d"),
-                "message_count": len(conv.get("messages", [])),
-                "last_message": conv.get("messages", [])[-1]["user"] if conv.get("messages") else ""
+                "message_count": conv["message_count"],
+                "last_message": last["user"] if last else ""
             })
         
-        return jsonify({"conversations": conversation_list})  # JSON response
+        return jsonify({"conversations": conversation_list, "next_cursor": next_cursor})  # JSON response
     except Exception as e:
-        print(f"ERROR getting conversations: {e}")
+        log.exception("Error getting conversations: %s", e)
         return jsonify({"error": "Failed to get conversations"}), 500  # JSON response
 
 @chatbot_bp.route("/conversation/<conversation_id>")
+@chatbot_bp.route("/conversation/<conversation_id>/messages")
+@cached_response(private=True)
 def get_conversation(conversation_id):
-    """API endpoint - returns JSON conversation details"""
+    """API endpoint - returns one page of a conversation as JSON.
+    
+    The newest page comes first; pass ``?before=<next_cursor>`` for older ones."""
     if not current_user.is_authenticated:
         return jsonify({"error": "Not authenticated"}), 401
     
@@ -554,13 +590,21 @@ def get_conversation(conversation_id):
         if not conversation:
             return jsonify({"error": "Conversation not found"}), 404  # JSON response
         
+        try:
+            messages, next_cursor = conversation_page(conversation, request.args.get("before"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        message_count, _ = conversation_summary(conversation)
         return jsonify({  # JSON response
             "id": str(conversation["_id"]),
             "date": conversation["created_at"].strftime("%Y-%m-%d %H:%M"),
-            "messages": conversation.get("messages", [])
+            "message_count": message_count,
+            "messages": messages,
+            "next_cursor": next_cursor
         })
     except Exception as e:
-        print(f"ERROR getting conversation: {e}")
+        log.exception("Error getting conversation: %s", e)
         return jsonify({"error": "Failed to get conversation"}), 500 
     
 @chatbot_bp.route("/clear_messages/<conversation_id>", methods=["POST"])
@@ -570,73 +614,53 @@ def clear_messages(conversation_id):
         return jsonify({"success": False, "error": "Not authenticated"}), 401
     
     try:
-        # Clear messages but keep the conversation
-        result = current_app.conversations_col.update_one(
-            {
-                "_id": ObjectId(conversation_id),
-                "user_id": str(current_user.id)
-            },
-            {
-                "$set": {
-                    "messages": [], 
-                    "updated_at": datetime.now()
-                }
-            }
-        )
-        
-        if result.modified_count > 0:
-            print(f"DEBUG: Cleared messages from conversation {conversation_id}")
+        # Clear messages (and their buckets) but keep the conversation
+        if clear_conversation(str(current_user.id), conversation_id):
+            log.debug("Cleared messages from conversation %s", conversation_id)
             return jsonify({"success": True})
         else:
             return jsonify({"success": False, "error": "Conversation not found"}), 404
             
     except Exception as e:
-        print(f"ERROR clearing messages: {e}")
+        log.exception("Error clearing messages: %s", e)
         return jsonify({"success": False, "error": str(e)}), 500
 
 @chatbot_bp.route("/clear_chats", methods=["POST"])
 def clear_all_chats():
     """Clear all chat conversations for the current user"""
-    print("DEBUG: clear_all_chats route called")  # Debug log
     if not current_user.is_authenticated:
         return jsonify({"success": False, "error": "Not authenticated"}), 401
     
     try:
-        # Delete all conversations for the current user
-        result = current_app.conversations_col.delete_many({
-            "user_id": str(current_user.id)
-        })
+        # Delete all conversations and message buckets for the current user
+        deleted_count = delete_all_conversations(str(current_user.id))
         
-        print(f"DEBUG: Cleared {result.deleted_count} conversations for user {current_user.id}")
-        return jsonify({"success": True, "deleted_count": result.deleted_count})
+        log.debug("Cleared %d conversations for user %s", deleted_count, current_user.id)
+        return jsonify({"success": True, "deleted_count": deleted_count})
         
     except Exception as e:
-        print(f"ERROR clearing chats: {e}")
+        log.exception("Error clearing chats: %s", e)
         return jsonify({"success": False, "error": str(e)}), 500
 
 @chatbot_bp.route("/delete_conversation/<conversation_id>", methods=["DELETE"])
 def delete_conversation(conversation_id):
     """Delete a specific conversation"""
-    print(f"DEBUG: delete_conversation route called for {conversation_id}")  # Debug log
     if not current_user.is_authenticated:
         return jsonify({"success": False, "error": "Not authenticated"}), 401
     
     try:
-        # Delete the specific conversation
-        result = current_app.conversations_col.delete_one({
-            "_id": ObjectId(conversation_id),
-            "user_id": str(current_user.id)
-        })
+        # Delete the specific conversation and its message buckets
+        deleted = delete_conversation_record(str(current_user.id), conversation_id)
         
-        print(f"DEBUG: Delete result - matched: {result.matched_count}, deleted: {result.deleted_count}")
+        log.debug("Delete conversation %s: deleted=%s", conversation_id, deleted)
         
-        if result.deleted_count > 0:
+        if deleted:
             return jsonify({"success": True})
         else:
             return jsonify({"success": False, "error": "Conversation not found"}), 404
             
     except Exception as e:
-        print(f"ERROR deleting conversation: {e}")
+        log.exception("Error deleting conversation: %s", e)
         return jsonify({"success": False, "error": str(e)}), 500
 
 @chatbot_bp.route("/test_delete", methods=["DELETE"])
@@ -0,0 +1,340 @@
+"""Chat conversation persistence.
+
+Every user has one conversation document per day, identified by
+``(user_id, day)``. It only holds a header (dates, ``message_count`` and
+``last_message``); the messages themselves live in ``conversation_messages``
+bucket documents of at most ``CONVERSATION_BUCKET_SIZE`` messages, so a busy
+day never grows one document without limit and a page of history is a single
+bucket read. Saving an exchange is two upserts and no reads: ``$inc``/``$set``
+on the header and ``$push`` into the newest bucket that still has room.
+
+Conversations saved before buckets existed keep their ``messages`` array,
+which is served as the oldest page.
+
+With ``CONVERSATION_WRITE_BEHIND`` enabled the upserts are queued instead and a
+background thread sends them to MongoDB in ordered ``bulk_write`` batches. The
+queue is drained when the process exits.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from bson import ObjectId
+from flask import current_app
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app.timing import timed
+
+log = logging.getLogger(__name__)
+
+# Marks the page holding a pre-bucket conversation's ``messages`` array
+LEGACY_PAGE = "legacy"
+
+
+def conversation_key(user_id, now):
+    """Key shared by a conversation header and its message buckets."""
+    return f"{user_id}:{now.strftime('%Y-%m-%d')}"
+
+
+def conversation_updates(user_id, user_message, bot_response, now=None, bucket_size=50):
+    """``[(app_collection_attr, filter, update), ...]`` upserts that append one exchange."""
+    now = now or datetime.now()
+    key = conversation_key(user_id, now)
+    message = {"user": user_message, "bot": bot_response, "timestamp": now}
+    header = (
+        "conversations_col",
+        {"user_id": user_id, "day": now.strftime("%Y-%m-%d")},
+        {
+            "$inc": {"message_count": 1},
+            "$set": {"updated_at": now, "last_message": message},
+            "$setOnInsert": {"created_at": now, "key": key},
+        },
+    )
+    # Matches the open bucket; once it is full the upsert starts a new one
+    bucket = (
+        "conversation_messages_col",
+        {"conversation_key": key, "count": {"$lt": bucket_size}},
+        {
+            "$push": {"messages": message},
+            "$inc": {"count": 1},
+            "$setOnInsert": {"user_id": user_id, "created_at": now},
+        },
+    )
+    return [header, bucket]
+
+
+class ConversationWriter:
+    """Batches conversation upserts off the request thread."""
+
+    def __init__(self, batch_size=100, flush_interval=0.5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.failed = 0
+        self._queue = queue.Queue()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="conversation-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, collection, operation):
+        if self._stopped:
+            # Shutting down: write through rather than lose the message
+            self._write([(collection, operation)])
+            return
+        self._queue.put((collection, operation))
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def flush(self):
+        """Block until every queued write has been sent."""
+        self._queue.join()
+
+    def close(self, timeout=10):
+        """Stop the worker after draining the queue."""
+        if self._stopped:
+            return
+        self._stopped = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            operation = self._queue.get()
+            batch, done = [], 1
+            stop = operation is None
+            if not stop:
+                batch.append(operation)
+            # Collect more writes for a short while so concurrent requests share a round trip
+            deadline = time.monotonic() + self.flush_interval
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    operation = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                done += 1
+                if operation is None:
+                    stop = True
+                else:
+                    batch.append(operation)
+
+            if batch:
+                self._write(batch)
+            for _ in range(done):
+                self._queue.task_done()
+
+            if stop:
+                # Anything submitted after close() started
+                leftover = []
+                while True:
+                    try:
+                        operation = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if operation is not None:
+                        leftover.append(operation)
+                    self._queue.task_done()
+                if leftover:
+                    self._write(leftover)
+                return
+
+    def _write(self, batch):
+        by_collection = {}
+        for collection, operation in batch:
+            by_collection.setdefault(collection.name, (collection, []))[1].append(operation)
+        for collection, operations in by_collection.values():
+            self._bulk_write(collection, operations)
+
+    def _bulk_write(self, collection, batch):
+        # Ordered, so two messages from the same user land in the order they were sent
+        while batch:
+            try:
+                collection.bulk_write(batch, ordered=True)
+                self.written += len(batch)
+                return
+            except BulkWriteError as e:
+                # Writes before the failed one are applied; skip it and continue with the rest
+                failed_at = e.details["writeErrors"][0]["index"]
+                log.error("Error saving conversation: %s", e.details["writeErrors"][0].get("errmsg"))
+                self.written += failed_at
+                self.failed += 1
+                batch = batch[failed_at + 1:]
+            except Exception as e:
+                # Not retried: $push is not idempotent and we can't tell what was applied
+                log.error("Error saving %d conversation messages: %s", len(batch), e)
+                self.failed += len(batch)
+                return
+
+
+def init_conversations(app):
+    """Start the write-behind queue if ``CONVERSATION_WRITE_BEHIND`` is set."""
+    app.conversation_writer = None
+    if not app.config.get("CONVERSATION_WRITE_BEHIND") or getattr(app, "conversations_col", None) is None:
+        return None
+    writer = ConversationWriter(
+        batch_size=app.config.get("CONVERSATION_BATCH_SIZE", 100),
+        flush_interval=app.config.get("CONVERSATION_FLUSH_INTERVAL", 0.5),
+    )
+    atexit.register(writer.close)
+    app.conversation_writer = writer
+    return writer
+
+
+@timed("save")
+def save_conversation(user_id, user_message, bot_response):
+    """Append one exchange to the user's conversation for today."""
+    try:
+        if not hasattr(current_app, 'conversations_col'):
+            log.error("conversations_col not found in app")
+            return False
+
+        updates = conversation_updates(
+            user_id, user_message, bot_response,
+            bucket_size=current_app.config.get("CONVERSATION_BUCKET_SIZE", 50),
+        )
+        writer = getattr(current_app, "conversation_writer", None)
+        for attr, filter_, update in updates:
+            collection = getattr(current_app, attr)
+            if writer is not None:
+                writer.submit(collection, UpdateOne(filter_, update, upsert=True))
+            else:
+                collection.update_one(filter_, update, upsert=True)
+        log.debug("Saved conversation message for user %s", user_id)
+        return True
+    except Exception as e:
+        log.exception("Error saving conversation: %s", e)
+        return False
+
+
+def conversation_summary(conversation):
+    """``(message_count, last_message)`` from a header, or from a legacy messages array."""
+    if "message_count" in conversation:
+        return conversation["message_count"], conversation.get("last_message")
+    messages = conversation.get("messages", [])
+    return len(messages), (messages[-1] if messages else None)
+
+
+def encode_list_cursor(conversation):
+    return f"{conversation['updated_at'].isoformat()}_{conversation['_id']}"
+
+
+def decode_list_cursor(cursor):
+    """``(updated_at, _id)`` from a listing cursor; raises ValueError if malformed."""
+    updated_at, _, oid = cursor.rpartition("_")
+    if not ObjectId.is_valid(oid):
+        raise ValueError("Invalid cursor")
+    return datetime.fromisoformat(updated_at), ObjectId(oid)
+
+
+def conversation_listing_pipeline(user_id, after=None, limit=20):
+    """Aggregation for one page of summaries; fetches ``limit + 1`` to detect a next page."""
+    match = {"user_id": user_id}
+    if after:
+        updated_at, oid = decode_list_cursor(after)
+        match["$or"] = [
+            {"updated_at": {"$lt": updated_at}},
+            {"updated_at": updated_at, "_id": {"$lt": oid}},
+        ]
+
+    messages = {"$ifNull": ["$messages", []]}
+    return [
+        {"$match": match},
+        {"$sort": {"updated_at": -1, "_id": -1}},
+        {"$limit": limit + 1},
+        {"$project": {
+            "created_at": 1,
+            "updated_at": 1,
+            "message_count": {"$ifNull": ["$message_count", {"$size": messages}]},
+            "last_message": {"$ifNull": ["$last_message", {"$arrayElemAt": [messages, -1]}]},
+        }},
+    ]
+
+
+def list_conversations(user_id, after=None, limit=20):
+    """One page of conversation summaries, most recently updated first.
+
+    Only the fields the listings show leave the server: ``message_count`` and
+    ``last_message`` come from the header, or are computed with ``$size`` /
+    the last array element for pre-bucket documents. Pages are keyset
+    paginated on ``(updated_at, _id)``. Returns ``(conversations, next_cursor)``.
+    """
+    pipeline = conversation_listing_pipeline(user_id, after, limit)
+    conversations = list(current_app.conversations_col.aggregate(pipeline))
+    next_cursor = None
+    if len(conversations) > limit:
+        conversations = conversations[:limit]
+        next_cursor = encode_list_cursor(conversations[-1])
+    return conversations, next_cursor
+
+
+def conversation_page(conversation, before=None):
+    """One page of a conversation's messages, oldest first within the page.
+
+    Pages run newest to oldest: the first page (``before=None``) is the newest
+    bucket, and ``next_cursor`` points at the next older page or is None.
+    Returns ``(messages, next_cursor)``; raises ValueError for a bad cursor.
+    """
+    buckets = current_app.conversation_messages_col
+    key = conversation.get("key")
+    legacy = conversation.get("messages") or []
+
+    if before == LEGACY_PAGE:
+        return legacy, None
+
+    bucket = None
+    if key:
+        query = {"conversation_key": key}
+        if before:
+            if not ObjectId.is_valid(before):
+                raise ValueError("Invalid cursor")
+            query["_id"] = {"$lt": ObjectId(before)}
+        bucket = buckets.find_one(query, {"messages": 1}, sort=[("_id", -1)])
+
+    if bucket is None:
+        # Buckets exhausted (or none yet): the legacy array is the oldest page
+        return (legacy, None) if not before else ([], None)
+
+    older = buckets.find_one({"conversation_key": key, "_id": {"$lt": bucket["_id"]}}, {"_id": 1})
+    if older:
+        next_cursor = str(bucket["_id"])
+    else:
+        next_cursor = LEGACY_PAGE if legacy else None
+    return bucket.get("messages", []), next_cursor
+
+
+def clear_conversation(user_id, conversation_id):
+    """Remove a conversation's messages but keep its header. Returns True if found."""
+    conversation = current_app.conversations_col.find_one_and_update(
+        {"_id": ObjectId(conversation_id), "user_id": user_id},
+        {
+            "$set": {"messages": [], "message_count": 0, "last_message": None, "updated_at": datetime.now()},
+        },
+        projection={"key": 1},
+    )
+    if not conversation:
+        return False
+    if conversation.get("key"):
+        current_app.conversation_messages_col.delete_many({"conversation_key": conversation["key"]})
+    return True
+
+
+def delete_conversation(user_id, conversation_id):
+    """Delete a conversation and its message buckets. Returns True if found."""
+    conversation = current_app.conversations_col.find_one_and_delete(
+        {"_id": ObjectId(conversation_id), "user_id": user_id},
+        projection={"key": 1},
+    )
+    if not conversation:
+        return False
+    if conversation.get("key"):
+        current_app.conversation_messages_col.delete_many({"conversation_key": conversation["key"]})
+    return True
+
+
+def delete_all_conversations(user_id):
+    """Delete every conversation and message bucket of a user. Returns the conversation count."""
+    result = current_app.conversations_col.delete_many({"user_id": user_id})
+    current_app.conversation_messages_col.delete_many({"user_id": user_id})
+    return result.deleted_count
@@ -0,0 +1,152 @@
+"""Precomputed movie lists for chatbot fallback and genre replies.
+
+The curated "highly recommended" list and a top list per genre are built from
+TMDB by a background refresher, saved to a JSON file and served from memory,
+so those chat replies make no network calls. Until the first refresh the
+curated titles are shown without metadata and genre lists are empty. A
+failed refresh keeps what was there and is retried after ``RETRY_SECONDS``.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from app.tmdb import search_movie, tmdb_discover_by_genre
+from app.chat_router import GENRE_KEYWORDS
+
+CURATED_TITLES = ["The Dark Knight", "Inception", "The Shawshank Redemption", "Pulp Fiction", "Forrest Gump"]
+GENRE_LIST_SIZE = 10
+# After a failed or partial refresh, try again this soon instead of waiting a full interval
+RETRY_SECONDS = 15 * 60
+
+_lists = {"curated": [], "genres": {}, "refreshed_at": 0}
+_lock = threading.Lock()
+_refresher = None
+
+log = logging.getLogger(__name__)
+
+
+def _entry(movie):
+    """Keep only what the chat formatters need."""
+    return {
+        "id": movie.get("id"),
+        "title": movie.get("title"),
+        "release_date": movie.get("release_date") or "",
+        "vote_average": movie.get("vote_average", movie.get("rating")),
+    }
+
+
+def get_curated():
+    """Curated list from memory; bare titles if it has never been refreshed."""
+    return _lists["curated"] or [{"title": t, "release_date": "", "vote_average": None} for t in CURATED_TITLES]
+
+
+def get_genre_list(genre, limit=5):
+    """Top movies for a TMDB genre name from memory, or [] if not materialized."""
+    return _lists["genres"].get(genre, [])[:limit]
+
+
+def load_lists(path):
+    """Load previously materialized lists from disk. Returns True on success."""
+    global _lists
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        with _lock:
+            _lists = data
+        log.debug("Loaded curated lists from %s", path)
+        return True
+    except FileNotFoundError:
+        return False
+    except Exception as e:
+        log.error("Error loading curated lists: %s", e)
+        return False
+
+
+def refresh_lists(app):
+    """Rebuild every list from TMDB, then swap it in and persist it.
+
+    A title or genre whose fetch fails keeps its previous entry, so an outage
+    never replaces good lists with empty ones. ``refreshed_at`` only moves
+    when everything was fetched; returns True in that case.
+    """
+    global _lists
+    previous = _lists
+    old_curated = dict(zip(CURATED_TITLES, previous.get("curated", [])))
+    failed = fetched = 0
+    with app.app_context():
+        curated = []
+        for title in CURATED_TITLES:
+            found = search_movie(title)
+            if found:
+                curated.append(_entry(found))
+                fetched += 1
+            else:
+                curated.append(old_curated.get(title) or {"title": title, "release_date": "", "vote_average": None})
+                failed += 1
+
+        genres = {}
+        for genre in sorted(set(GENRE_KEYWORDS.values())):
+            # Popular-genre discovery is never legitimately empty
+            movies = tmdb_discover_by_genre(genre, limit=GENRE_LIST_SIZE)
+            if movies:
+                genres[genre] = [_entry(m) for m in movies]
+                fetched += 1
+            else:
+                genres[genre] = previous.get("genres", {}).get(genre, [])
+                failed += 1
+
+    if not fetched:
+        log.warning("Curated lists not refreshed: every TMDB fetch failed")
+        return False
+
+    refreshed_at = time.time() if not failed else previous.get("refreshed_at", 0)
+    data = {"curated": curated, "genres": genres, "refreshed_at": refreshed_at}
+    with _lock:
+        _lists = data
+
+    path = app.config.get("CURATED_LISTS_PATH")
+    if path:
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp = f"{path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+        except Exception as e:
+            log.error("Error saving curated lists: %s", e)
+    if failed:
+        log.warning("Curated lists partly refreshed (%d of %d fetches failed, kept previous entries)",
+                    failed, failed + fetched)
+    else:
+        log.info("Curated lists refreshed (%d genre entries)", sum(len(v) for v in genres.values()))
+    return not failed
+
+
+def start_refresher(app):
+    """Load lists from disk and keep them fresh on a background thread."""
+    global _refresher
+    path = app.config.get("CURATED_LISTS_PATH")
+    if path:
+        load_lists(path)
+
+    interval = float(app.config.get("CURATED_REFRESH_HOURS", 24)) * 3600
+    if interval <= 0 or not app.config.get("TMDB_API_KEY") or _refresher is not None:
+        return None
+
+    def run():
+        while True:
+            age = time.time() - _lists.get("refreshed_at", 0)
+            if age < interval:
+                time.sleep(max(60, interval - age))
+                continue
+            try:
+                complete = refresh_lists(app)
+            except Exception as e:
+                log.error("Error refreshing curated lists: %s", e)
+                complete = False
+            time.sleep(interval if complete else min(interval, RETRY_SECONDS))
+
+    _refresher = threading.Thread(target=run, name="curated-refresh", daemon=True)
+    _refresher.start()
+    return _refresher
@@ -0,0 +1,101 @@
+"""MongoDB indexes, applied as numbered migrations at startup.
+
+Each migration runs once per database and is recorded in the
+``schema_migrations`` collection, so adding an index means appending a new
+version rather than editing an old one. Index creation is idempotent, so
+several workers starting at the same time is harmless.
+
+``HOT_QUERIES`` lists the queries the app runs on every request or login;
+``scripts/check_query_plans.py`` explains each of them against a real mongod
+and fails if any of them scans a whole collection.
+"""
+import logging
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+log = logging.getLogger(__name__)
+
+def _v1_initial_indexes(db):
+    db.users.create_indexes([
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("verification_token", ASCENDING)], name="verification_token"),
+        IndexModel([("reset_token", ASCENDING)], name="reset_token"),
+    ])
+    db.conversations.create_indexes([
+        # One conversation per user and day; pre-bucket documents have no day
+        IndexModel([("user_id", ASCENDING), ("day", ASCENDING)], name="user_day_unique", unique=True,
+                   partialFilterExpression={"day": {"$exists": True}}),
+        # Listing: keyset pagination on (updated_at, _id)
+        IndexModel([("user_id", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)],
+                   name="user_updated"),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_created"),
+    ])
+    db.conversation_messages.create_indexes([
+        # Open-bucket upsert and newest-first page reads
+        IndexModel([("conversation_key", ASCENDING), ("_id", DESCENDING)], name="conversation_pages"),
+        IndexModel([("user_id", ASCENDING)], name="user"),
+    ])
+    db.chats.create_indexes([
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_created"),
+    ])
+
+
+# (version, description, function(db)); append only
+MIGRATIONS = [
+    (1, "initial indexes", _v1_initial_indexes),
+]
+
+
+def migrate(db):
+    """Apply every migration not yet recorded. Returns the versions applied now."""
+    applied = {doc["_id"] for doc in db.schema_migrations.find({}, {"_id": 1})}
+    newly_applied = []
+    for version, description, apply in MIGRATIONS:
+        if version in applied:
+            continue
+        try:
+            apply(db)
+        except OperationFailure as e:
+            # e.g. duplicate usernames block a unique index; retried on next start
+            log.error("Schema migration %d (%s) failed: %s", version, description, e)
+            break
+        try:
+            db.schema_migrations.insert_one({
+                "_id": version,
+                "description": description,
+                "applied_at": datetime.utcnow(),
+            })
+        except DuplicateKeyError:
+            pass  # another worker recorded it first
+        newly_applied.append(version)
+        log.info("Applied schema migration %d: %s", version, description)
+    return newly_applied
+
+
+def schema_version(db):
+    """Highest applied migration version, or 0."""
+    latest = db.schema_migrations.find_one(sort=[("_id", DESCENDING)])
+    return latest["_id"] if latest else 0
+
+
+# (name, collection, filter, sort) for scripts/check_query_plans.py; values are placeholders
+HOT_QUERIES = [
+    ("login by username", "users", {"username": "someone"}, None),
+    ("signup duplicate check", "users", {"$or": [{"username": "someone"}, {"email": "a@b.c"}]}, None),
+    ("forgot password by email", "users", {"email": "a@b.c"}, None),
+    ("verify email token", "users", {"verification_token": "token"}, None),
+    ("reset password token", "users", {"reset_token": "token", "reset_token_expiry": {"$gt": datetime(2000, 1, 1)}}, None),
+    ("conversation upsert", "conversations", {"user_id": "u", "day": "2000-01-01"}, None),
+    ("conversation listing", "conversations", {"user_id": "u"}, [("updated_at", -1), ("_id", -1)]),
+    ("conversation listing, next page", "conversations",
+     {"user_id": "u", "$or": [{"updated_at": {"$lt": datetime(2000, 1, 1)}},
+                              {"updated_at": datetime(2000, 1, 1), "_id": {"$lt": ObjectId("0" * 24)}}]},
+     [("updated_at", -1), ("_id", -1)]),
+    ("debug recent conversations", "conversations", {"user_id": "u"}, [("created_at", -1)]),
+    ("open message bucket", "conversation_messages", {"conversation_key": "u:2000-01-01", "count": {"$lt": 50}}, None),
+    ("message page", "conversation_messages", {"conversation_key": "u:2000-01-01"}, [("_id", -1)]),
+    ("delete user's buckets", "conversation_messages", {"user_id": "u"}, None),
+]
@@ -0,0 +1,86 @@
+"""Cache validators and compression for JSON endpoints.
+
+``@cached_response(...)`` goes under the route decorator. For successful GET
+responses it adds a strong ETag (hash of the body), answers a matching
+``If-None-Match`` with an empty 304, sets ``Cache-Control``/``Vary`` and,
+when the client accepts it, compresses large bodies with brotli (if the
+optional ``brotli`` package is installed) or gzip.
+
+Each encoding gets its own ETag (``"<hash>-gzip"``), since the bytes differ,
+but a validator from any encoding of the same body still earns a 304.
+"""
+import gzip
+import hashlib
+from functools import wraps
+from flask import request, make_response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+ENCODING_SUFFIXES = ("", "-br", "-gzip")
+
+
+def _choose_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def _compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def cached_response(max_age=0, private=False, compress=True, min_size=MIN_COMPRESS_SIZE):
+    """Add ETag/304, Cache-Control, Vary and compression to a view.
+
+    ``max_age=0`` makes clients revalidate every time (cheap with the ETag).
+    Use ``private=True`` for per-user responses so shared caches keep out.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            response = make_response(view(*args, **kwargs))
+            if (request.method not in ("GET", "HEAD") or response.status_code != 200
+                    or response.is_streamed or response.headers.get("Content-Encoding")):
+                return response
+
+            body = response.get_data()
+            etag = hashlib.sha256(body).hexdigest()[:32]
+
+            cache_control = response.cache_control
+            if private:
+                cache_control.private = True
+            else:
+                cache_control.public = True
+            if max_age:
+                cache_control.max_age = max_age
+            else:
+                cache_control.no_cache = True
+            response.vary.add("Accept-Encoding")
+            if private:
+                response.vary.add("Cookie")
+
+            encoding = _choose_encoding() if compress and len(body) >= min_size else None
+            response.set_etag(etag + (f"-{encoding}" if encoding else ""))
+
+            if any(request.if_none_match.contains(etag + suffix) for suffix in ENCODING_SUFFIXES):
+                response.status_code = 304
+                response.set_data(b"")
+                response.headers.pop("Content-Length", None)
+                return response
+
+            if encoding:
+                response.set_data(_compress(body, encoding))
+                response.headers["Content-Encoding"] = encoding
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,235 @@
+"""Poster thumbnails served from a local disk cache.
+
+Cards link to ``/img/poster/<size>/<file>`` instead of TMDB's w500 image, so a
+small card can load a small poster (``srcset`` lists every size). The first
+request for a poster fetches the largest size once from ``POSTER_ORIGIN`` and
+resizes it locally with Pillow for the other sizes. If Pillow is missing a
+warning is logged at startup and each size is fetched from the origin, which
+serves them all.
+
+Files live under ``POSTER_CACHE_DIR`` and are evicted least recently used
+once they add up to more than ``POSTER_CACHE_MAX_MB``. TMDB gives a changed
+poster a new file name, so responses are cached by browsers for a year.
+
+``POSTER_ORIGIN`` can be a ``file://`` directory laid out like the origin
+(``<dir>/w500/<file>``), which makes a local stand-in for tests.
+"""
+import io
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+import requests
+from flask import Blueprint, abort, send_file
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+images_bp = Blueprint("images", __name__)
+log = logging.getLogger(__name__)
+
+TMDB_IMAGE_ORIGIN = "https://image.tmdb.org/t/p"
+# Widths offered to the browser; the largest is the one fetched from the origin
+POSTER_SIZES = {"w92": 92, "w185": 185, "w342": 342, "w500": 500}
+SOURCE_SIZE = "w500"
+CARD_SIZE = "w342"
+# Cards are 1/2, 1/3 or 1/4 of the row (col-6 col-sm-4 col-md-3)
+CARD_SIZES_ATTR = "(min-width: 768px) 25vw, (min-width: 576px) 33vw, 50vw"
+POSTER_FILE = re.compile(r"^[A-Za-z0-9_-]+\.(?:jpg|jpeg|png|webp)$")
+MIME_TYPES = {"jpg": "image/jpeg", "jpeg": "image/jpeg", "png": "image/png", "webp": "image/webp"}
+PIL_FORMATS = {"jpg": "JPEG", "jpeg": "JPEG", "png": "PNG", "webp": "WEBP"}
+ONE_YEAR = 31536000
+
+
+class PosterCache:
+    def __init__(self, directory="data/poster_cache", max_bytes=512 * 1024 * 1024,
+                 origin=TMDB_IMAGE_ORIGIN, timeout=10):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.origin = origin.rstrip("/")
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.origin_fetches = 0
+        self._files = OrderedDict()  # "w185/abc.jpg" -> size in bytes, oldest first
+        self._total = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._building = {}
+
+    def _load(self):
+        """Index what earlier runs left on disk, oldest use first."""
+        found = []
+        for size in POSTER_SIZES:
+            folder = os.path.join(self.directory, size)
+            if not os.path.isdir(folder):
+                continue
+            for entry in os.scandir(folder):
+                if entry.is_file() and POSTER_FILE.match(entry.name):
+                    stat = entry.stat()
+                    found.append((stat.st_mtime, f"{size}/{entry.name}", stat.st_size))
+        for _, key, nbytes in sorted(found):
+            self._files[key] = nbytes
+            self._total += nbytes
+        self._loaded = True
+        self._evict()
+
+    def get(self, size, filename):
+        """Local path of the poster at ``size``, fetching/resizing on a miss. None if unavailable."""
+        key = f"{size}/{filename}"
+        path = os.path.join(self.directory, size, filename)
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if key in self._files and os.path.isfile(path):
+                self._files.move_to_end(key)
+                self.hits += 1
+                touch = True
+            else:
+                touch = False
+                building = self._building.setdefault(key, threading.Lock())
+        if touch:
+            try:
+                os.utime(path)  # keeps LRU order across restarts
+            except OSError:
+                pass
+            return path
+
+        # One build per poster; concurrent requests wait for it instead of hitting the origin
+        with building:
+            try:
+                with self._lock:
+                    if key in self._files and os.path.isfile(path):
+                        self.hits += 1
+                        return path
+                    self.misses += 1
+                data = self._build(size, filename)
+                if data is None:
+                    return None
+                self._store(key, path, data)
+                return path
+            finally:
+                with self._lock:
+                    self._building.pop(key, None)
+
+    def _build(self, size, filename):
+        if size == SOURCE_SIZE or Image is None:
+            return self._fetch(size, filename)
+        source = self.get(SOURCE_SIZE, filename)
+        if source is None:
+            return None
+        try:
+            return resize(source, POSTER_SIZES[size], PIL_FORMATS[extension(filename)])
+        except Exception as e:
+            log.error("Error resizing poster %s to %s: %s", filename, size, e)
+            return None
+
+    def _fetch(self, size, filename):
+        self.origin_fetches += 1
+        try:
+            if self.origin.startswith("file://"):
+                with open(os.path.join(self.origin[len("file://"):], size, filename), "rb") as f:
+                    return f.read()
+            resp = requests.get(f"{self.origin}/{size}/{filename}", timeout=self.timeout)
+            resp.raise_for_status()
+            if not resp.headers.get("Content-Type", "image/").startswith("image/"):
+                raise ValueError(f"unexpected content type {resp.headers.get('Content-Type')}")
+            return resp.content
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            log.error("Error fetching poster %s/%s: %s", size, filename, e)
+            return None
+
+    def _store(self, key, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._total += len(data) - self._files.pop(key, 0)
+            self._files[key] = len(data)
+            self._evict()
+
+    def _evict(self):
+        while self._total > self.max_bytes and len(self._files) > 1:
+            key, nbytes = self._files.popitem(last=False)
+            self._total -= nbytes
+            try:
+                os.remove(os.path.join(self.directory, key))
+            except OSError:
+                pass  # already removed by another worker
+
+    def stats(self):
+        return {
+            "files": len(self._files), "bytes": self._total, "hits": self.hits,
+            "misses": self.misses, "origin_fetches": self.origin_fetches,
+        }
+
+
+def extension(filename):
+    return filename.rsplit(".", 1)[1].lower()
+
+
+def resize(source, width, fmt="JPEG"):
+    """Bytes of ``source`` scaled down to ``width`` pixels wide, encoded as ``fmt``."""
+    with Image.open(source) as image:
+        if image.width <= width:
+            with open(source, "rb") as f:
+                return f.read()
+        height = round(image.height * width / image.width)
+        if fmt == "JPEG":
+            image = image.convert("RGB")
+        image = image.resize((width, height), Image.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, fmt, quality=85, optimize=True, progressive=True)
+        return out.getvalue()
+
+
+poster_cache = PosterCache()
+proxy_enabled = True
+
+
+def poster_url(poster_path, size=CARD_SIZE):
+    """URL of a TMDB ``poster_path`` (``/abc.jpg``) at ``size``."""
+    if not poster_path:
+        return None
+    if not proxy_enabled:
+        return f"{poster_cache.origin}/{size}{poster_path}"
+    return f"/img/poster/{size}{poster_path}"
+
+
+def poster_srcset(poster_path):
+    """``srcset`` value listing every poster width."""
+    if not poster_path:
+        return None
+    return ", ".join(f"{poster_url(poster_path, size)} {width}w" for size, width in POSTER_SIZES.items())
+
+
+@images_bp.route("/img/poster/<size>/<filename>")
+def poster(size, filename):
+    if size not in POSTER_SIZES or not POSTER_FILE.match(filename):
+        abort(404)
+    path = poster_cache.get(size, filename)
+    if path is None:
+        abort(404)
+    response = send_file(path, mimetype=MIME_TYPES[extension(filename)], max_age=ONE_YEAR)
+    response.headers["Cache-Control"] = f"public, max-age={ONE_YEAR}, immutable"
+    return response
+
+
+def init_images(app):
+    global proxy_enabled
+    proxy_enabled = app.config.get("POSTER_PROXY_ENABLED", True)
+    poster_cache.origin = app.config.get("POSTER_ORIGIN", TMDB_IMAGE_ORIGIN).rstrip("/")
+    poster_cache.directory = os.path.abspath(app.config.get("POSTER_CACHE_DIR", "data/poster_cache"))
+    poster_cache.max_bytes = int(app.config.get("POSTER_CACHE_MAX_MB", 512) * 1024 * 1024)
+    if proxy_enabled and Image is None:
+        log.warning("Pillow is not installed: posters are fetched from the origin at every size "
+                    "instead of resized locally (pip install Pillow)")
+    app.register_blueprint(images_bp)
+    app.jinja_env.globals["card_image_sizes"] = CARD_SIZES_ATTR
@@ -0,0 +1,119 @@
+"""Intent classification and live answers for movie questions.
+
+Instead of embedding five templated questions per movie, the chatbot finds the
+movie title in the message with the catalog title index, classifies what is
+being asked against a handful of intent prototypes, and renders the answer
+straight from the dataset row. Memory and search cost depend on the number of
+prototypes, not on the size of the catalog.
+"""
+import re
+import time
+import pandas as pd
+from app.metrics import observe_encode
+
+# Example phrasings per intent, written without the movie title
+INTENT_PROTOTYPES = {
+    "plot": [
+        "what is the movie about",
+        "tell me about",
+        "what is the plot of",
+        "what happens in",
+        "give me a summary of",
+        "describe the story",
+    ],
+    "rating": [
+        "is it a good movie",
+        "what is the rating of",
+        "how good is",
+        "what score does it have",
+        "is it worth it",
+    ],
+    "popularity": [
+        "how popular is",
+        "is it popular",
+        "is it famous",
+        "how well known is",
+    ],
+    "should_watch": [
+        "should i watch",
+        "would you recommend watching",
+        "is it worth watching",
+        "should i see",
+    ],
+}
+
+# Used when the sentence-transformer model is unavailable
+INTENT_KEYWORDS = {
+    "should_watch": re.compile(r"\bshould i (watch|see)\b|\bworth watching\b"),
+    "popularity": re.compile(r"\bpopular(ity)?\b|\bfamous\b|\bwell known\b"),
+    "rating": re.compile(r"\brating\b|\brated\b|\bscore\b|\bgood\b|\bworth\b"),
+    "plot": re.compile(r"\babout\b|\bplot\b|\bstory\b|\bsummary\b|\bhappens\b"),
+}
+
+# Minimum cosine similarity to a prototype before we trust the intent
+MIN_INTENT_SCORE = 0.45
+
+
+class IntentClassifier:
+    """Nearest-prototype intent classifier over sentence embeddings."""
+
+    def __init__(self, model, prototypes=INTENT_PROTOTYPES):
+        self.model = model
+        self.labels = []
+        phrases = []
+        for intent, examples in prototypes.items():
+            self.labels.extend([intent] * len(examples))
+            phrases.extend(examples)
+        self.embeddings = None
+        if model is not None:
+            start = time.perf_counter()
+            self.embeddings = model.encode(phrases, convert_to_numpy=True, normalize_embeddings=True)
+            observe_encode("intent_prototypes", len(phrases), time.perf_counter() - start)
+
+    def classify(self, text):
+        """Return ``(intent, score)``; ``(None, 0.0)`` if nothing is close enough."""
+        text = text.strip()
+        if not text:
+            # Bare title: describing the movie is the most useful answer
+            return "plot", 1.0
+
+        if self.embeddings is None:
+            for intent, pattern in INTENT_KEYWORDS.items():
+                if pattern.search(text):
+                    return intent, 1.0
+            return None, 0.0
+
+        start = time.perf_counter()
+        query = self.model.encode(text, convert_to_numpy=True, normalize_embeddings=True)
+        observe_encode("intent", 1, time.perf_counter() - start)
+        scores = self.embeddings @ query
+        best = int(scores.argmax())
+        if scores[best] < MIN_INTENT_SCORE:
+            return None, float(scores[best])
+        return self.labels[best], float(scores[best])
+
+
+def _number(value, default=0):
+    value = pd.to_numeric(value, errors="coerce")
+    return default if pd.isna(value) else value
+
+
+def render_answer(intent, row):
+    """Render the reply for ``intent`` from a dataset row (Series or dict)."""
+    title = row.get("title")
+    overview = row.get("overview")
+    overview = overview.replace("\n", " ").strip() if isinstance(overview, str) and overview.strip() \
+        else "No overview available."
+    vote_average = _number(row.get("vote_average"))
+    vote_count = int(_number(row.get("vote_count")))
+    popularity = float(_number(row.get("popularity")))
+
+    if intent == "plot":
+        return f"📖 Here's the plot of *{title}*: {overview}"
+    if intent == "rating":
+        return f"⭐ Well *{title}* has a rating of {vote_average}/10 based on {vote_count} votes."
+    if intent == "popularity":
+        return f"📊 *{title}* has a popularity score of {popularity:.2f}."
+    if intent == "should_watch":
+        return f"🎯 *{title}* has a {vote_average}/10 rating, so what do you think 🎬🍿?"
+    return None
@@ -0,0 +1,159 @@
+"""Application logging: levels, sampling, rate limiting, off-thread output.
+
+Modules log through ``logging.getLogger(__name__)``, so everything under the
+``app`` logger is configured here. Records are handed to a queue in the
+calling thread and written to stderr by a listener thread, so a slow terminal
+or log pipe never blocks a request.
+
+- ``LOG_LEVEL`` (default INFO): debug calls below it cost one level check, as
+  long as they use ``%s`` arguments rather than f-strings.
+- Per-item debug lines pass ``extra=SAMPLED`` and only a ``LOG_SAMPLE_RATE``
+  fraction of them is kept.
+- Each warning or error template logs at most ``LOG_RATE_LIMIT`` times per
+  ``LOG_RATE_WINDOW`` seconds. The next line let through says how many were
+  dropped, so a TMDB outage can't flood the log. INFO and DEBUG records are
+  left to ``LOG_LEVEL`` and sampling: one ``TIMING`` line per request is the
+  point, not a flood.
+- ``LOG_FORMAT=json`` writes one JSON object per line, including any
+  ``extra=`` fields, for log collectors.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+SAMPLED = {"sampled": True}
+# Attributes every LogRecord has; anything else came from extra=
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a ``rate`` fraction of records logged with ``extra=SAMPLED``."""
+
+    def __init__(self, rate=0.01):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return not getattr(record, "sampled", False) or random.random() < self.rate
+
+
+class RateLimitFilter(logging.Filter):
+    """At most ``limit`` warnings/errors per message template every ``window`` seconds."""
+
+    def __init__(self, limit=20, window=60.0, level=logging.WARNING):
+        super().__init__()
+        self.limit = limit
+        self.level = level
+        self.window = window
+        self._windows = {}  # (logger, template) -> [window start, count, dropped]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.limit <= 0 or record.levelno < self.level:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            state = self._windows.get(key)
+            if state is None or now - state[0] >= self.window:
+                dropped = state[2] if state else 0
+                self._windows[key] = [now, 1, 0]
+            elif state[1] >= self.limit:
+                state[2] += 1
+                return False
+            else:
+                state[1] += 1
+                dropped, state[2] = state[2], 0
+        if dropped:
+            record.suppressed = dropped
+        return True
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record):
+        text = super().format(record)
+        if getattr(record, "suppressed", 0):
+            text += f" [{record.suppressed} similar messages suppressed]"
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and key != "sampled":
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _ForkSafeQueueHandler(QueueHandler):
+    """Restarts the listener in a forked worker, whose copy of the thread is dead."""
+
+    def __init__(self, output):
+        self.output = output
+        self.listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+        super().__init__(queue.SimpleQueue())
+        self._start()
+
+    def _start(self):
+        self.queue = queue.SimpleQueue()
+        self.listener = QueueListener(self.queue, self.output, respect_handler_level=True)
+        self.listener.start()
+        self._pid = os.getpid()
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._start()
+        self.queue.put_nowait(record)
+
+    def stop(self):
+        """Write out what is queued and stop the listener."""
+        if self.listener is not None and self._pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+
+
+_handler = None
+
+
+def configure_logging(app):
+    """Route the ``app`` loggers through a queue to stderr, as configured by ``LOG_*``."""
+    global _handler
+    logger = logging.getLogger("app")
+    if _handler is not None:
+        logger.removeHandler(_handler)
+        _handler.stop()
+
+    output = logging.StreamHandler()
+    output.setFormatter(JsonFormatter() if app.config.get("LOG_FORMAT") == "json" else TextFormatter())
+
+    _handler = _ForkSafeQueueHandler(output)
+    _handler.addFilter(SamplingFilter(app.config.get("LOG_SAMPLE_RATE", 0.01)))
+    _handler.addFilter(RateLimitFilter(app.config.get("LOG_RATE_LIMIT", 20), app.config.get("LOG_RATE_WINDOW", 60)))
+
+    level = app.config.get("LOG_LEVEL", "INFO")
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.addHandler(_handler)
+    logger.propagate = False
+    atexit.register(_handler.stop)
+    return logger
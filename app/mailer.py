@@ -0,0 +1,162 @@
+"""Background email delivery.
+
+``send_email`` hands messages to a ``MailQueue`` instead of talking SMTP
+inside the request. Worker threads each keep one SMTP connection open and
+reuse it for following messages, closing it after ``MAIL_IDLE_TIMEOUT``
+seconds without mail. A failed send is retried with exponential backoff.
+After ``MAIL_MAX_RETRIES`` attempts the message is written to the
+``mail_failures`` collection, so it can be inspected or re-sent later.
+
+Set ``MAIL_QUEUE_ENABLED=False`` to send inline (tests, scripts). To see
+mail locally without a real account, run an SMTP sink and point the app at it:
+
+    python -m aiosmtpd -n -l localhost:8025
+    MAIL_SERVER=localhost MAIL_PORT=8025 MAIL_USE_TLS=False
+
+``scripts/check_mailer.py`` runs the queue against a built-in sink that can
+refuse mail, and checks delivery, retries and ``mail_failures``.
+"""
+import atexit
+import logging
+import queue
+import threading
+from datetime import datetime
+
+log = logging.getLogger(__name__)
+
+
+class MailQueue:
+    def __init__(self, app, workers=2, max_retries=4, backoff=2.0, idle_timeout=30):
+        self.app = app
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.idle_timeout = idle_timeout
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self._queue = queue.Queue()
+        self._timers = set()
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._workers = [
+            threading.Thread(target=self._run, name=f"mail-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, message):
+        """Queue a flask_mail Message for delivery."""
+        self._queue.put((message, 1))
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def close(self, timeout=30):
+        """Deliver what is queued, then stop the workers. Pending retries are recorded as failed."""
+        if self._stopped:
+            return
+        self._stopped = True
+        with self._lock:
+            timers, self._timers = self._timers, set()
+        for timer in timers:
+            timer.cancel()
+            message, next_attempt = timer.args[0]
+            self._record_failure(message, next_attempt - 1, "shut down before retry")
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout)
+
+    def _run(self):
+        mail = self.app.extensions["mail"]
+        connection = None
+        with self.app.app_context():
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.idle_timeout)
+                except queue.Empty:
+                    # Servers drop idle sessions; reconnect on the next message
+                    connection = self._disconnect(connection)
+                    continue
+
+                if item is None:
+                    self._disconnect(connection)
+                    self._queue.task_done()
+                    return
+
+                message, attempt = item
+                try:
+                    if connection is None:
+                        connection = mail.connect()
+                        connection.__enter__()
+                    connection.send(message)
+                    self.sent += 1
+                    log.debug("Email %r sent (attempt %d)", message.subject, attempt)
+                except Exception as e:
+                    connection = self._disconnect(connection)
+                    self._retry(message, attempt, e)
+                finally:
+                    self._queue.task_done()
+
+    def _disconnect(self, connection):
+        if connection is not None:
+            try:
+                connection.__exit__(None, None, None)
+            except Exception:
+                pass  # already closed by the server
+        return None
+
+    def _retry(self, message, attempt, error):
+        if attempt >= self.max_retries or self._stopped:
+            self._record_failure(message, attempt, error)
+            return
+        delay = self.backoff * 2 ** (attempt - 1)
+        log.warning("Email %r failed (%s), retry %d in %gs", message.subject, error, attempt, delay)
+        self.retried += 1
+        timer = threading.Timer(delay, self._requeue, args=((message, attempt + 1),))
+        timer.daemon = True
+        with self._lock:
+            self._timers.add(timer)
+        timer.start()
+
+    def _requeue(self, item):
+        with self._lock:
+            self._timers.discard(threading.current_thread())
+        self._queue.put(item)
+
+    def _record_failure(self, message, attempts, error):
+        self.failed += 1
+        log.error("Giving up on email %r after %d attempts: %s", message.subject, attempts, error)
+        try:
+            with self.app.app_context():
+                self.app.db["mail_failures"].insert_one({
+                    "recipients": list(message.recipients),
+                    "subject": message.subject,
+                    "message": message.as_string(),
+                    "attempts": attempts,
+                    "error": str(error),
+                    "failed_at": datetime.utcnow(),
+                })
+        except Exception as e:
+            log.error("Error recording failed email: %s", e)
+
+    def stats(self):
+        return {"queued": self.depth(), "sent": self.sent, "retried": self.retried, "failed": self.failed}
+
+
+def init_mailer(app):
+    """Start the mail workers unless ``MAIL_QUEUE_ENABLED`` is off or the app is testing."""
+    app.mail_queue = None
+    if not app.config.get("MAIL_QUEUE_ENABLED", True) or app.config.get("TESTING"):
+        return None
+    mail_queue = MailQueue(
+        app,
+        workers=app.config.get("MAIL_WORKERS", 2),
+        max_retries=app.config.get("MAIL_MAX_RETRIES", 4),
+        backoff=app.config.get("MAIL_RETRY_BACKOFF", 2.0),
+        idle_timeout=app.config.get("MAIL_IDLE_TIMEOUT", 30),
+    )
+    atexit.register(mail_queue.close)
+    app.mail_queue = mail_queue
+    return mail_queue
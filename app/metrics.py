@@ -0,0 +1,381 @@
+"""Prometheus metrics at ``/metrics``, without a client library or agent.
+
+Metrics are declared below and updated in-process (a dict update under a
+lock; histograms and counters are skipped entirely while ``METRICS_ENABLED``
+is off). Each worker process writes its values to ``<METRICS_DIR>/<pid>.json``
+every ``METRICS_FLUSH_INTERVAL`` seconds, and a scrape merges every file:
+counters and histogram buckets are summed over all processes (including ones
+that have exited, so totals never go backwards), gauges are summed or maxed
+over the processes still alive. Without ``METRICS_DIR`` only the scraped
+process is reported, which is right for the single-process dev server.
+Empty ``METRICS_DIR`` when (re)starting the server.
+
+Covered: request latency per route, stage latency (from ``app.timing``
+spans), TMDB calls/errors/latency per endpoint, cache hits and misses,
+encoder batch sizes, queue depths, Mongo command latency and dataset/model
+load times. Cache hit ratio, for example::
+
+    sum by (cache) (rate(app_cache_hits_total[5m]))
+      / sum by (cache) (rate(app_cache_hits_total[5m]) + rate(app_cache_misses_total[5m]))
+"""
+import glob
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from flask import Blueprint, Response, current_app
+from pymongo import monitoring
+
+metrics_bp = Blueprint("metrics", __name__)
+log = logging.getLogger(__name__)
+
+enabled = False
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+_registry = {}
+_collectors = []
+_lock = threading.Lock()
+_pid = os.getpid()
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}  # label values tuple -> value
+        _registry[name] = self
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        if not enabled:
+            return
+        key = self._key(labels)
+        with _lock:
+            _check_fork()
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def set_total(self, value, **labels):
+        """For collectors reporting a running total kept elsewhere."""
+        self.values[self._key(labels)] = value
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, name, help, labelnames=(), aggregate="sum"):
+        super().__init__(name, help, labelnames)
+        self.aggregate = aggregate  # "sum" or "max" across live processes
+
+    def set(self, value, **labels):
+        # Always recorded: load times are set at import, before metrics are configured
+        with _lock:
+            self.values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        if not enabled:
+            return
+        key = self._key(labels)
+        with _lock:
+            _check_fork()
+            # [count per bucket..., count above the last bucket, sum]
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+                    break
+            else:
+                entry[len(self.buckets)] += 1
+            entry[-1] += value
+
+
+REQUEST_DURATION = Histogram("app_request_duration_seconds", "Request latency by route",
+                             ("route", "method", "status"))
+STAGE_DURATION = Histogram("app_stage_duration_seconds", "Time spent per request in each stage", ("stage",))
+TMDB_REQUESTS = Counter("tmdb_requests_total", "TMDB API calls by endpoint and outcome", ("endpoint", "outcome"))
+TMDB_DURATION = Histogram("tmdb_request_duration_seconds", "TMDB API latency by endpoint", ("endpoint",))
+MONGO_DURATION = Histogram("mongo_command_duration_seconds", "MongoDB command latency",
+                           ("command", "collection", "outcome"))
+ENCODER_BATCH = Histogram("encoder_batch_size", "Texts per sentence-encoder call", ("caller",), BATCH_BUCKETS)
+ENCODER_DURATION = Histogram("encoder_duration_seconds", "Sentence-encoder call latency", ("caller",))
+CACHE_HITS = Counter("app_cache_hits_total", "Cache hits", ("cache",))
+CACHE_MISSES = Counter("app_cache_misses_total", "Cache misses", ("cache",))
+QUEUE_DEPTH = Gauge("app_queue_depth", "Items waiting in background queues", ("queue",))
+LOAD_SECONDS = Gauge("app_load_seconds", "Time taken to load datasets and models", ("component",),
+                     aggregate="max")
+
+
+def _check_fork():
+    """Drop counts inherited from the parent process (e.g. gunicorn --preload)."""
+    global _pid
+    if _pid == os.getpid():
+        return
+    _pid = os.getpid()
+    for metric in _registry.values():
+        if metric.type != "gauge":
+            metric.values = {}
+    _start_flusher()
+
+
+# -----------------------------
+# Recording helpers
+# -----------------------------
+def observe_request(record):
+    """``app.timing`` record callback: route and stage latency."""
+    REQUEST_DURATION.observe(record["duration_ms"] / 1000, route=record["endpoint"] or "unmatched",
+                             method=record["method"], status=record["status"])
+    for stage, span in record["spans"].items():
+        STAGE_DURATION.observe(span["ms"] / 1000, stage=stage)
+
+
+_ID_SEGMENT = re.compile(r"/\d+")
+
+
+def observe_tmdb(endpoint, seconds, error=None):
+    endpoint = _ID_SEGMENT.sub("/{id}", endpoint)
+    TMDB_REQUESTS.inc(endpoint=endpoint, outcome=type(error).__name__ if error else "ok")
+    TMDB_DURATION.observe(seconds, endpoint=endpoint)
+
+
+def observe_encode(caller, batch_size, seconds):
+    ENCODER_BATCH.observe(batch_size, caller=caller)
+    ENCODER_DURATION.observe(seconds, caller=caller)
+
+
+def record_load_time(component, seconds):
+    LOAD_SECONDS.set(round(seconds, 3), component=component)
+
+
+class MongoMetricsListener(monitoring.CommandListener):
+    def __init__(self):
+        # Only the started event carries the command (and so the collection name)
+        self._collections = {}
+
+    def started(self, event):
+        if enabled:
+            collection = event.command.get(event.command_name)
+            self._collections[(event.connection_id, event.request_id)] = (
+                collection if isinstance(collection, str) else "")
+
+    def _observe(self, event, outcome):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        MONGO_DURATION.observe(event.duration_micros / 1e6, command=event.command_name,
+                               collection=collection, outcome=outcome)
+
+    def succeeded(self, event):
+        self._observe(event, "ok")
+
+    def failed(self, event):
+        self._observe(event, "error")
+
+
+def register_collector(fn):
+    """``fn()`` runs before each snapshot to copy stats kept elsewhere into metrics."""
+    _collectors.append(fn)
+    return fn
+
+
+def _collect_app_stats(app):
+    from app.models import user_cache
+    from app.page_cache import page_cache
+    from app.images import poster_cache
+    from app import translation
+
+    caches = {"user": user_cache, "page": page_cache, "poster": poster_cache}
+    if translation._service is not None:
+        caches["translation"] = translation._service.cache
+    for name, cache in caches.items():
+        CACHE_HITS.set_total(cache.hits, cache=name)
+        CACHE_MISSES.set_total(cache.misses, cache=name)
+
+    for name, attr in (("conversation_writes", "conversation_writer"), ("mail", "mail_queue")):
+        queue = getattr(app, attr, None)
+        if queue is not None:
+            QUEUE_DEPTH.set(queue.depth(), queue=name)
+
+
+# -----------------------------
+# Snapshots and exposition
+# -----------------------------
+def snapshot():
+    """This process's values as a JSON-able dict."""
+    for collector in _collectors:
+        try:
+            collector()
+        except Exception as e:
+            log.error("Error in metrics collector: %s", e)
+    with _lock:
+        return {
+            "pid": os.getpid(),
+            "metrics": {
+                name: [[list(key), value] for key, value in metric.values.items()]
+                for name, metric in _registry.items()
+            },
+        }
+
+
+def _write_snapshot(directory):
+    path = os.path.join(directory, f"{os.getpid()}.json")
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f)
+    os.replace(tmp, path)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def _load_snapshots(directory):
+    snapshots = []
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        try:
+            with open(path, encoding="utf-8") as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # being rewritten or from an older format
+    return snapshots
+
+
+def merge(snapshots):
+    """Combine per-process snapshots into ``{name: {labels: value}}``."""
+    merged = {name: {} for name in _registry}
+    for snap in snapshots:
+        alive = snap["pid"] == os.getpid() or _pid_alive(snap["pid"])
+        for name, samples in snap["metrics"].items():
+            metric = _registry.get(name)
+            if metric is None or (metric.type == "gauge" and not alive):
+                continue
+            values = merged[name]
+            for key, value in samples:
+                key = tuple(key)
+                if key not in values:
+                    values[key] = list(value) if metric.type == "histogram" else value
+                elif metric.type == "histogram":
+                    values[key] = [a + b for a, b in zip(values[key], value)]
+                elif metric.type == "gauge" and metric.aggregate == "max":
+                    values[key] = max(values[key], value)
+                else:
+                    values[key] += value
+    return merged
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{n}="{v}"' for (n, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_number(value):
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def exposition(merged):
+    """Prometheus text format (version 0.0.4)."""
+    lines = []
+    for name, metric in _registry.items():
+        lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {metric.type}")
+        for key, value in sorted(merged.get(name, {}).items()):
+            if metric.type != "histogram":
+                lines.append(f"{name}{_format_labels(metric.labelnames, key)} {_format_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (float("inf"),), value[:-1]):
+                cumulative += count
+                le = ("le", _format_number(float(bound)))
+                lines.append(f"{name}_bucket{_format_labels(metric.labelnames, key, le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(metric.labelnames, key)} {_format_number(value[-1])}")
+            lines.append(f"{name}_count{_format_labels(metric.labelnames, key)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+@metrics_bp.route("/metrics")
+def metrics():
+    directory = current_app.config.get("METRICS_DIR")
+    if directory:
+        _write_snapshot(directory)
+        snapshots = _load_snapshots(directory)
+    else:
+        snapshots = [snapshot()]
+    return Response(exposition(merge(snapshots)), mimetype="text/plain; version=0.0.4")
+
+
+_flusher = None
+_flush_settings = {"directory": None, "interval": 5.0}
+
+
+def _flush_loop():
+    while True:
+        time.sleep(_flush_settings["interval"])
+        try:
+            _write_snapshot(_flush_settings["directory"])
+        except Exception as e:
+            log.error("Error writing metrics snapshot: %s", e)
+
+
+def _start_flusher():
+    # Threads don't survive a fork, so each worker starts its own
+    global _flusher
+    if not enabled or not _flush_settings["directory"]:
+        return
+    _flusher = threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True)
+    _flusher.start()
+
+
+_mongo_listener = None
+
+
+def init_metrics(app):
+    """Enable metrics and install hooks. Call before creating the MongoClient."""
+    global enabled, _mongo_listener
+    enabled = app.config.get("METRICS_ENABLED", False)
+    if not enabled:
+        return
+    directory = app.config.get("METRICS_DIR")
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    _flush_settings.update(directory=directory, interval=app.config.get("METRICS_FLUSH_INTERVAL", 5.0))
+
+    from app.timing import on_record
+    on_record(observe_request)
+    register_collector(lambda: _collect_app_stats(app))
+    if _mongo_listener is None:
+        _mongo_listener = MongoMetricsListener()
+        monitoring.register(_mongo_listener)
+    app.register_blueprint(metrics_bp)
+    if _flusher is None:
+        _start_flusher()
+    log.info("Metrics enabled at /metrics (%s)", directory or "single process")
@@ -1,3 +1,6 @@
+import threading
+import time
+from collections import OrderedDict
 from flask_login import UserMixin
 from bson.objectid import ObjectId
 from app import login_manager
@@ -11,10 +14,66 @@ class User(UserMixin):
         self.email = doc.get("email")
         self.verified = doc.get("verified", False)
 
+class UserCache:
+    """Per-process LRU of User objects that expire after ``ttl`` seconds.
+
+    ``hits`` counts the Mongo lookups avoided. Other workers only see an
+    invalidation once their own entry expires, so keep ``ttl`` short."""
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                self._users.pop(user_id, None)
+                self.misses += 1
+                return None
+            self._users.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, user_id, user):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._users[user_id] = (time.monotonic() + self.ttl, user)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_size:
+                self._users.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def stats(self):
+        return {"size": len(self._users), "hits": self.hits, "misses": self.misses}
+
+user_cache = UserCache()
+
+def init_user_cache(app):
+    user_cache.max_size = app.config.get("USER_CACHE_SIZE", 1024)
+    user_cache.ttl = app.config.get("USER_CACHE_TTL", 60)
+
+def invalidate_user(user_id):
+    """Drop a cached User after its record changes"""
+    user_cache.invalidate(str(user_id))
+
 @login_manager.user_loader
 def load_user(user_id):
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
     try:
         doc = current_app.users_col.find_one({"_id": ObjectId(user_id)})
-        return User(doc) if doc else None
+        user = User(doc) if doc else None
+        if user:
+            user_cache.set(user_id, user)
+        return user
     except Exception:
         return None
\ No newline at end of file
@@ -0,0 +1,124 @@
+"""Trending cards and the rendered home page, cached per process.
+
+Trending movies are fetched from TMDB at most every ``TRENDING_TTL`` seconds
+and turned into cards once per country. Whenever the trending list actually
+changes its ``version`` is bumped, which also retires every cached page.
+
+``GET /`` is the same HTML for every visitor with the same country and login
+state, so the rendered page is kept in a small LRU keyed by
+``(country, logged_in, trending version)``. Responses carry an ETag (hash of
+the body, identical across workers) and Last-Modified (when trending last
+changed), so browsers revalidate with a 304 instead of downloading the page.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from app.tmdb import tmdb_trending, make_card_from_tmdb_obj
+
+TRENDING_LIMIT = 8
+# Retry a failed TMDB fetch sooner than a full TTL
+TRENDING_RETRY_SECONDS = 60
+
+log = logging.getLogger(__name__)
+
+
+class TrendingCache:
+    def __init__(self, ttl=1800):
+        self.ttl = ttl
+        self.version = 0
+        self.updated_at = datetime.now(timezone.utc).replace(microsecond=0)
+        self._ids = ()
+        self._movies = []
+        self._expires = 0
+        self._cards = {}
+        self._lock = threading.Lock()
+
+    def refresh(self, force=False):
+        """Re-fetch trending if it is stale. Returns the current version."""
+        if not force and time.monotonic() < self._expires:
+            return self.version
+        with self._lock:
+            if not force and time.monotonic() < self._expires:
+                return self.version
+            movies = tmdb_trending(limit=TRENDING_LIMIT)
+            if not movies:
+                # Keep serving the last good list
+                self._expires = time.monotonic() + min(self.ttl, TRENDING_RETRY_SECONDS)
+                return self.version
+            ids = tuple(m.get("id") for m in movies)
+            if ids != self._ids:
+                self._ids, self._movies = ids, movies
+                self._cards = {}
+                self.version += 1
+                self.updated_at = datetime.now(timezone.utc).replace(microsecond=0)
+                page_cache.clear()
+                log.debug("Trending changed (version %d)", self.version)
+            self._expires = time.monotonic() + self.ttl
+            return self.version
+
+    def cards(self, country):
+        """Trending cards for ``country``, built once per trending version."""
+        version = self.refresh()
+        cached = self._cards.get(country)
+        if cached and cached[0] == version:
+            return cached[1]
+        cards = [c for c in (make_card_from_tmdb_obj(m, country) for m in self._movies) if c]
+        self._cards[country] = (version, cards)
+        return cards
+
+
+class PageCache:
+    """Small LRU of rendered pages: key -> (etag, body)."""
+
+    def __init__(self, max_size=64):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            page = self._pages.get(key)
+            if page is None:
+                self.misses += 1
+                return None
+            self._pages.move_to_end(key)
+            self.hits += 1
+            return page
+
+    def set(self, key, body):
+        etag = hashlib.sha1(body.encode("utf-8")).hexdigest()
+        with self._lock:
+            self._pages[key] = (etag, body)
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_size:
+                self._pages.popitem(last=False)
+        return etag, body
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+    def stats(self):
+        return {"size": len(self._pages), "hits": self.hits, "misses": self.misses}
+
+
+page_cache = PageCache()
+trending_cache = TrendingCache()
+
+
+def init_page_cache(app):
+    trending_cache.ttl = app.config.get("TRENDING_TTL", 1800)
+    page_cache.max_size = app.config.get("PAGE_CACHE_SIZE", 64)
+
+
+def cached_page(key, render):
+    """``(etag, body)`` for ``key``, rendering with ``render()`` on a miss."""
+    page = page_cache.get(key)
+    if page is None:
+        page = page_cache.set(key, render())
+    return page
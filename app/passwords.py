@@ -0,0 +1,149 @@
+"""Password hashing off the request thread.
+
+bcrypt is slow on purpose, so hashing and checking run in a small process
+pool instead of the web worker's threads. A semaphore caps how many are in
+flight per process; when it stays full for ``PASSWORD_HASH_QUEUE_TIMEOUT``
+seconds the caller gets ``PasswordHasherBusy`` instead of queueing forever,
+so a burst of logins can't starve ``/`` and ``/chat``.
+
+The cost factor is ``BCRYPT_LOG_ROUNDS`` (pick it with
+``scripts/benchmark_bcrypt.py``). Hashes made with another cost are
+upgraded the next time their owner logs in (``needs_rehash``).
+Hashes are the same ``$2b$`` format Flask-Bcrypt writes.
+
+Workers are started with ``spawn``: the pool is created on the first login,
+when the process already runs logging, mail and metrics threads, and forking
+then could copy a lock another thread holds. Jobs are plain ``bcrypt``
+functions, so a worker imports nothing but ``bcrypt`` (and ``app.py``,
+which skips ``create_app`` in ``__mp_main__``).
+"""
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import bcrypt
+
+log = logging.getLogger(__name__)
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Too many password operations in flight; try again shortly."""
+
+
+def _to_bytes(value):
+    return value.encode("utf-8") if isinstance(value, str) else value
+
+
+def hash_rounds(hashed):
+    """Cost factor stored in a ``$2b$12$...`` hash, or None."""
+    try:
+        return int(_to_bytes(hashed).split(b"$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    def __init__(self, rounds=12, workers=2, concurrency=4, queue_timeout=5.0):
+        self.rounds = rounds
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+
+    def _executor(self):
+        # One pool per process: a pool created before a fork is unusable in the child
+        if self.workers <= 0:
+            return None
+        if self._pool is None or self._pool_pid != os.getpid():
+            with self._pool_lock:
+                if self._pool is None or self._pool_pid != os.getpid():
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+                    self._pool_pid = os.getpid()
+        return self._pool
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise PasswordHasherBusy("Password hashing is overloaded")
+        try:
+            executor = self._executor()
+            if executor is None:
+                return fn(*args)
+            try:
+                return executor.submit(fn, *args).result()
+            except BrokenProcessPool:
+                # A worker died (OOM kill, crash); the pool is unusable from now on
+                log.warning("Password hashing pool broken, starting a new one")
+                self._discard(executor)
+                executor = self._executor()
+                try:
+                    return executor.submit(fn, *args).result()
+                except BrokenProcessPool as e:
+                    self._discard(executor)
+                    raise PasswordHasherBusy("Password hashing workers keep dying") from e
+        finally:
+            self._slots.release()
+
+    def _discard(self, executor):
+        with self._pool_lock:
+            if self._pool is executor:
+                self._pool = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def hash(self, password, rounds=None):
+        """bcrypt hash of ``password`` as a str."""
+        if not password:
+            raise ValueError("Password must be non-empty.")
+        salt = bcrypt.gensalt(rounds=rounds or self.rounds, prefix=b"2b")
+        return self._run(bcrypt.hashpw, _to_bytes(password), salt).decode("utf-8")
+
+    def check(self, hashed, password):
+        """True if ``password`` matches ``hashed``."""
+        if not hashed or not password:
+            return False
+        try:
+            return self._run(bcrypt.checkpw, _to_bytes(password), _to_bytes(hashed))
+        except ValueError:
+            return False  # not a bcrypt hash
+
+    def needs_rehash(self, hashed):
+        return hash_rounds(hashed) != self.rounds
+
+    def shutdown(self):
+        if self._pool is not None and self._pool_pid == os.getpid():
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+
+
+hasher = PasswordHasher()
+
+
+def init_passwords(app):
+    """Configure the hasher from ``BCRYPT_LOG_ROUNDS`` and ``PASSWORD_HASH_*``."""
+    global hasher
+    hasher.shutdown()
+    hasher = PasswordHasher(
+        rounds=app.config.get("BCRYPT_LOG_ROUNDS", 12),
+        workers=app.config.get("PASSWORD_HASH_WORKERS", 2),
+        concurrency=app.config.get("PASSWORD_HASH_CONCURRENCY", 4),
+        queue_timeout=app.config.get("PASSWORD_HASH_QUEUE_TIMEOUT", 5.0),
+    )
+    atexit.register(hasher.shutdown)
+    return hasher
+
+
+def hash_password(password):
+    return hasher.hash(password)
+
+
+def check_password(hashed, password):
+    return hasher.check(hashed, password)
+
+
+def needs_rehash(hashed):
+    return hasher.needs_rehash(hashed)
@@ -0,0 +1,131 @@
+"""Memory-mapped storage for the chatbot Q&A embeddings.
+
+A store is a directory holding:
+
+    meta.json           model name, row count, embedding dim and dtype
+    embeddings.npy      (n, dim) float16 matrix of L2-normalised embeddings
+    questions.bin       UTF-8 strings concatenated back to back
+    questions.idx.npy   int64 offsets (n + 1) into questions.bin
+    answers.bin / answers.idx.npy   same layout for the answers
+
+Everything is opened with ``mmap_mode='r'`` so loading is near-instant and
+the pages are shared between forked workers instead of being copied into
+each process like the old pickle.
+"""
+import json
+import os
+import numpy as np
+
+STORE_VERSION = 1
+# Built from the embeddings by app.ann; stale as soon as the store is rewritten.
+# ivf.json goes first so a half-removed index is never opened.
+DERIVED_FILES = ("ivf.json", "ivf_centroids.npy", "ivf_offsets.npy", "ivf_ids.npy",
+                 "pq_codebooks.npy", "pq_codes.npy")
+
+
+class StringTable:
+    """Read-only list of strings backed by a byte blob and an offset index."""
+
+    def __init__(self, blob_path, index_path):
+        self.offsets = np.load(index_path, mmap_mode="r")
+        if os.path.getsize(blob_path) > 0:
+            self.blob = np.memmap(blob_path, dtype=np.uint8, mode="r")
+        else:
+            self.blob = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self.blob[start:end].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def _write_strings(path_prefix, strings):
+    offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+    with open(f"{path_prefix}.bin", "wb") as f:
+        pos = 0
+        for i, s in enumerate(strings):
+            data = str(s).encode("utf-8")
+            f.write(data)
+            pos += len(data)
+            offsets[i + 1] = pos
+    np.save(f"{path_prefix}.idx.npy", offsets)
+
+
+def write_qa_store(store_dir, questions, answers, embeddings, model_name, dtype="float16"):
+    """Write questions, answers and embeddings to ``store_dir``.
+
+    ``embeddings`` may be a numpy array or a torch tensor; rows are
+    L2-normalised before saving so a dot product is the cosine similarity.
+    An ANN index left from the previous contents is removed; rebuild it with
+    ``scripts/generate_qa_embeddings.py``.
+    """
+    if len(questions) != len(answers) or len(questions) != len(embeddings):
+        raise ValueError("questions, answers and embeddings must have the same length")
+
+    if hasattr(embeddings, "cpu"):
+        embeddings = embeddings.cpu().numpy()
+    emb = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(emb, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    emb = (emb / norms).astype(dtype)
+
+    os.makedirs(store_dir, exist_ok=True)
+    for name in DERIVED_FILES:
+        try:
+            os.remove(os.path.join(store_dir, name))
+        except FileNotFoundError:
+            pass
+    np.save(os.path.join(store_dir, "embeddings.npy"), emb)
+    _write_strings(os.path.join(store_dir, "questions"), questions)
+    _write_strings(os.path.join(store_dir, "answers"), answers)
+
+    meta = {
+        "version": STORE_VERSION,
+        "model_name": model_name,
+        "count": int(emb.shape[0]),
+        "dim": int(emb.shape[1]) if emb.ndim == 2 else 0,
+        "dtype": str(emb.dtype),
+        "normalized": True,
+    }
+    # Written last so a half-written store is never picked up
+    with open(os.path.join(store_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def store_exists(store_dir):
+    return os.path.exists(os.path.join(store_dir, "meta.json"))
+
+
+def load_qa_store(store_dir):
+    """Open a store written by ``write_qa_store``.
+
+    Returns ``(questions, answers, embeddings, meta)`` where the first two are
+    ``StringTable`` objects and ``embeddings`` is a read-only memmap.
+    """
+    with open(os.path.join(store_dir, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+
+    embeddings = np.load(os.path.join(store_dir, "embeddings.npy"), mmap_mode="r")
+    questions = StringTable(
+        os.path.join(store_dir, "questions.bin"),
+        os.path.join(store_dir, "questions.idx.npy"),
+    )
+    answers = StringTable(
+        os.path.join(store_dir, "answers.bin"),
+        os.path.join(store_dir, "answers.idx.npy"),
+    )
+
+    if len(questions) != meta["count"] or embeddings.shape[0] != meta["count"]:
+        raise ValueError(f"QA store at {store_dir} is inconsistent with its meta.json")
+    return questions, answers, embeddings, meta
@@ -1,56 +1,269 @@
-from app.tmdb import search_movie, make_card_from_tmdb_obj, tmdb_similar
+import json
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
+from flask import current_app
+from itsdangerous import URLSafeSerializer, BadSignature
+from app.tmdb import search_movie, make_card_from_tmdb_obj, tmdb_similar, tmdb_genres
 from app.utils import linear_kernel  # Only import what we need
+from app.timing import span
+from app.logging_setup import SAMPLED
 
-def recommend_from_dataset(title: str, top_n=8, country="US"):
+log = logging.getLogger(__name__)
+
+_UNRESOLVED = object()
+
+class ResolvedMovie:
+    """A movie resolved once per request: dataset row, TMDB match and canonical title.
+    
+    The TMDB search is done lazily and at most once, so passing the same object
+    through the recommendation helpers never repeats a lookup.
+    """
+    def __init__(self, title, row_id=None, tmdb=_UNRESOLVED):
+        self.title = title
+        self.row_id = row_id
+        self._tmdb = tmdb
+    
+    @property
+    def tmdb(self):
+        if self._tmdb is _UNRESOLVED:
+            self._tmdb = search_movie(self.title)
+        return self._tmdb
+    
+    @property
+    def tmdb_id(self):
+        return self.tmdb.get("id") if self.tmdb else None
+    
+    def __str__(self):
+        return self.title
+    
+    def __repr__(self):
+        return f"ResolvedMovie({self.title!r}, row_id={self.row_id})"
+
+def resolve_movie(name):
+    """Resolve a movie name against the local title index, then TMDB. None if unknown."""
+    from app import utils
+    from app.utils import normalize_title, find_title_in_text
+    
+    if utils.df is not None:
+        row = utils.title_index.get(normalize_title(name))
+        if row is None:
+            # The name may carry extra words ("the matrix please")
+            row, _ = find_title_in_text(name)
+        if row is not None:
+            return ResolvedMovie(utils.df.iloc[row]["title"], row_id=row)
+    
+    found = search_movie(name)
+    if found:
+        return ResolvedMovie(found.get("title") or name, tmdb=found)
+    return None
+
+def recommend_from_dataset(title, top_n=8, country="US", filters=None):
+    """Cards for the dataset movies most similar to ``title`` (a name or ResolvedMovie).
+    
+    ``filters`` (see ``utils.parse_filters``) are applied as a column mask before
+    ranking, so only qualifying movies are scored and sent to TMDB.
+    """
+    cards = enrich_rows(similar_dataset_rows(title, top_n, filters), country)
+    log.debug("Total cards from dataset: %d", len(cards))
+    return cards
+
+def similar_dataset_rows(title, top_n=8, filters=None):
+    """Row positions of the ``top_n`` dataset movies most similar to ``title``."""
     # Import df and tfidf_matrix dynamically to avoid timing issues
-    from app.utils import df, tfidf_matrix
+    from app.utils import df, tfidf_matrix, filter_mask
     
     if df is None or tfidf_matrix is None:
-        print("DEBUG: Dataset or TF-IDF matrix not loaded in recommend_from_dataset")
+        log.warning("Dataset or TF-IDF matrix not loaded in similar_dataset_rows")
         return []
+    
+    if isinstance(title, ResolvedMovie):
+        if title.row_id is None:
+            log.debug("'%s' is not in dataset", title)
+            return []
+        idx = title.row_id
+    else:
+        key = title.strip().lower()
         
-    key = title.strip().lower()
-    print(f"DEBUG: Looking for '{key}' in dataset")
+        matches = df.index[df["title_clean"] == key]
+        if len(matches) == 0:
+            log.debug("'%s' not found in dataset", key)
+            return []
+        idx = matches[0]
     
-    if key not in set(df["title_clean"].values):
-        print(f"DEBUG: '{key}' not found in dataset")
-        return []
+    mask = filter_mask(filters)
+    if mask is None:
+        candidates = np.arange(tfidf_matrix.shape[0])
+    else:
+        mask[idx] = False
+        candidates = np.flatnonzero(mask)
+        log.debug("%d movies pass filters %s", len(candidates), filters)
+    
+    with span("tfidf"):
+        sims = linear_kernel(tfidf_matrix[idx:idx+1], tfidf_matrix[candidates]).flatten()
+        k = min(top_n + 1, len(candidates))
+        top = np.argpartition(-sims, k - 1)[:k] if k else []
+        top = sorted(top, key=lambda j: -sims[j])
+    return [int(i) for i in candidates[top] if i != idx][:top_n]
 
-    idx = df.index[df["title_clean"] == key][0]
-    sims = linear_kernel(tfidf_matrix[idx:idx+1], tfidf_matrix).flatten()
-    order = sims.argsort()[::-1]
-    order = [i for i in order if i != idx][:top_n]
+def enrich_rows(rows, country="US"):
+    """Turn dataset row positions into TMDB-backed cards, skipping misses."""
+    return list(iter_enriched_rows(rows, country))
 
-    cards = []
-    for i in order:
+def iter_enriched_rows(rows, country="US"):
+    """Yield each row's card as soon as its TMDB lookups finish."""
+    from app.utils import df
+    
+    for i in rows:
         title_i = df.iloc[i]["title"]
-        print(f"DEBUG: Similar movie found: {title_i}")
         tm = search_movie(title_i)
         if tm:
-            print(f"DEBUG: TMDB found: {tm.get('title')}")
             card = make_card_from_tmdb_obj(tm, country)
             if card:
-                cards.append(card)
-                print(f"DEBUG: Added card for: {card.get('title')}")
+                log.debug("Added card for %s (TMDB %s)", title_i, tm.get("id"), extra=SAMPLED)
+                yield card
         else:
-            print(f"DEBUG: TMDB not found for: {title_i}")
+            log.debug("TMDB not found for: %s", title_i, extra=SAMPLED)
+
+# -----------------------------
+# Paginated rankings
+# -----------------------------
+RANKING_CACHE_SIZE = 128
+_ranking_cache = OrderedDict()
+_ranking_lock = threading.Lock()
+_ranking_version = None
+
+def _ranking_key(seed_rows, filters, version):
+    return (version, tuple(sorted(seed_rows)), json.dumps(filters or {}, sort_keys=True))
+
+def rank_for_seeds(seed_rows, filters=None):
+    """Full ranking of dataset rows by similarity to the closest seed.
     
-    print(f"DEBUG: Total cards from dataset: {len(cards)}")
-    return cards
+    Computed once per (seeds, filters) and kept in a small LRU, so later pages
+    are just slices of the stored array. Rankings are row positions, so they
+    are keyed by the dataset's content version and the LRU is emptied when
+    ``load_dataset`` loads a different file.
+    """
+    global _ranking_version
+    from app.utils import tfidf_matrix, filter_mask, dataset_version
+    
+    key = _ranking_key(seed_rows, filters, dataset_version)
+    with _ranking_lock:
+        if _ranking_version != dataset_version:
+            _ranking_cache.clear()
+            _ranking_version = dataset_version
+        if key in _ranking_cache:
+            _ranking_cache.move_to_end(key)
+            return _ranking_cache[key]
+    
+    mask = filter_mask(filters)
+    if mask is None:
+        mask = np.ones(tfidf_matrix.shape[0], dtype=bool)
+    mask[list(seed_rows)] = False
+    candidates = np.flatnonzero(mask)
+    
+    with span("tfidf"):
+        sims = linear_kernel(tfidf_matrix[list(seed_rows)], tfidf_matrix[candidates]).max(axis=0)
+        ranking = candidates[np.argsort(-sims, kind="stable")].astype(np.int32)
+    
+    with _ranking_lock:
+        if _ranking_version != dataset_version:
+            return ranking  # reloaded meanwhile; don't cache a ranking of the old rows
+        _ranking_cache[key] = ranking
+        while len(_ranking_cache) > RANKING_CACHE_SIZE:
+            _ranking_cache.popitem(last=False)
+    return ranking
 
-def recommend_fallback_tmdb(title: str, top_n=8, country="US"):
-    print(f"DEBUG: Trying TMDB fallback for: {title}")
-    found = search_movie(title)
-    if not found:
-        print("DEBUG: TMDB search returned no results")
-        return []
+def _cursor_serializer():
+    return URLSafeSerializer(current_app.config["SECRET_KEY"], salt="recommendations-cursor")
+
+def encode_cursor(seed_rows, filters, offset):
+    from app.utils import dataset_version
+    return _cursor_serializer().dumps({"s": [int(r) for r in seed_rows], "f": filters or {}, "o": int(offset),
+                                       "v": dataset_version})
+
+def decode_cursor(cursor):
+    """Return ``(seed_rows, filters, offset)``, or None if the cursor is invalid.
     
-    print(f"DEBUG: TMDB found: {found.get('title')}")
-    similar = tmdb_similar(found.get("id"), limit=top_n)
-    print(f"DEBUG: TMDB similar movies: {len(similar)} found")
+    Cursors carry the content version of the dataset they were issued for. One
+    issued for another file (e.g. before a redeploy that changed it) is invalid:
+    its seed rows and offset refer to other movies.
+    """
+    from app.utils import dataset_version
+    try:
+        data = _cursor_serializer().loads(cursor)
+        if dataset_version is None or data.get("v") != dataset_version:
+            return None
+        return data["s"], data["f"], int(data["o"])
+    except (BadSignature, KeyError, TypeError, ValueError):
+        return None
+
+def recommendation_page(seed_rows, filters=None, offset=0, limit=8, country="US"):
+    """One page of cards from the stored ranking, plus the cursor for the next page.
+    
+    Only the rows on this page are enriched through TMDB.
+    """
+    from app.utils import df, tfidf_matrix
+    
+    if df is None or tfidf_matrix is None or not seed_rows:
+        return [], None
+    
+    ranking = rank_for_seeds(seed_rows, filters)
+    rows = ranking[offset:offset + limit]
+    cards = enrich_rows([int(r) for r in rows], country)
+    
+    next_offset = offset + limit
+    next_cursor = encode_cursor(seed_rows, filters, next_offset) if next_offset < len(ranking) else None
+    return cards, next_cursor
+
+def tmdb_result_passes(movie: dict, filters) -> bool:
+    """Check a TMDB list result against filters before it is enriched.
+    
+    List results carry no runtime, so runtime filters cannot be applied here.
+    """
+    if not filters:
+        return True
+    year = (movie.get("release_date") or "")[:4]
+    year = int(year) if year.isdigit() else None
+    rating = movie.get("vote_average")
+    checks = [
+        ("year_min", year, lambda v, f: v >= f),
+        ("year_max", year, lambda v, f: v <= f),
+        ("rating_min", rating, lambda v, f: v >= f),
+    ]
+    for name, value, ok in checks:
+        if name in filters and (value is None or not ok(value, filters[name])):
+            return False
+    if filters.get("genres"):
+        genre_map = tmdb_genres()["map"]
+        wanted = {genre_map.get(g.lower()) for g in filters["genres"]}
+        if not wanted <= set(movie.get("genre_ids", [])):
+            return False
+    return True
+
+def recommend_fallback_tmdb(title, top_n=8, country="US", filters=None):
+    """Cards for TMDB's similar movies to ``title`` (a name or ResolvedMovie)."""
+    valid_cards = list(iter_fallback_tmdb(title, top_n, country, filters))
+    log.debug("Valid TMDB cards: %d", len(valid_cards))
+    return valid_cards
+
+def iter_fallback_tmdb(title, top_n=8, country="US", filters=None):
+    """Yield TMDB similar-movie cards one at a time as they are enriched."""
+    log.debug("Trying TMDB fallback for: %s", title)
+    found = title.tmdb if isinstance(title, ResolvedMovie) else search_movie(title)
+    if not found:
+        log.debug("TMDB search returned no results for: %s", title)
+        return
     
-    cards = [make_card_from_tmdb_obj(m, country) for m in similar]
-    valid_cards = [c for c in cards if c]
-    print(f"DEBUG: Valid TMDB cards: {len(valid_cards)}")
+    if filters:
+        # Filter the whole first page before enrichment, then cut to top_n
+        similar = [m for m in tmdb_similar(found.get("id"), limit=20) if tmdb_result_passes(m, filters)][:top_n]
+    else:
+        similar = tmdb_similar(found.get("id"), limit=top_n)
+    log.debug("TMDB similar movies for %s: %d found", found.get("title"), len(similar))
     
-    return valid_cards
\ No newline at end of file
+    for m in similar:
+        card = make_card_from_tmdb_obj(m, country)
+        if card:
+            yield card
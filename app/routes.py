@@ -1,81 +1,151 @@
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, current_app
+from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, current_app, make_response
 from flask_login import login_required, current_user
-from app.utils import get_user_country_guess, find_multiple_close_titles, load_dataset
-from app.tmdb import tmdb_trending, make_card_from_tmdb_obj
-from app.recommendation import recommend_from_dataset, recommend_fallback_tmdb
+from app.utils import get_user_country_guess, find_multiple_close_titles, find_multiple_close_rows, load_dataset, parse_filters
+from app.chat_router import GENRE_KEYWORDS
+from app.recommendation import recommend_from_dataset, recommend_fallback_tmdb, recommendation_page, decode_cursor
+from app.conversations import conversation_summary, conversation_page, list_conversations
+from app.models import user_cache
+from app.images import poster_cache
+from app.page_cache import trending_cache, page_cache, cached_page
+from app.http_cache import cached_response
+from app.timing import span
 import asyncio
+import logging
 from bson import ObjectId
 
 main_bp = Blueprint('main', __name__)
+log = logging.getLogger(__name__)
+
+RECOMMENDATION_PAGE_SIZE = 8
+CHAT_HISTORY_PAGE_SIZE = 20
 
 @main_bp.record_once
 def on_load(state):
-    print("DEBUG: Loading dataset...")
+    log.info("Loading dataset...")
     data_path = state.app.config.get('DATA_PATH', 'data/movies_with_features.xlsx')  # Updated path
     load_dataset(data_path)
-    print("DEBUG: Dataset loaded")
+    log.info("Dataset loaded")
     
 @main_bp.route("/", methods=["GET", "POST"])
 def index():
     auto_country = get_user_country_guess()
     country = request.form.get("country", auto_country)
 
-    query = ""
-    not_found_message = None
-    recommendations = []
+    if request.method == "GET":
+        return cached_index(country)
 
-    trending_cards = [make_card_from_tmdb_obj(m, country) for m in tmdb_trending(limit=8)]
-    trending = [c for c in trending_cards if c]
+    if not current_user.is_authenticated:
+        flash("Please log in to search and get recommendations.", "warning")
+        return redirect(url_for("auth.login"))
 
-    if request.method == "POST":
-        if not current_user.is_authenticated:
-            flash("Please log in to search and get recommendations.", "warning")
-            return redirect(url_for("auth.login"))
+    not_found_message = None
+    recommendations = []
+    filters = parse_filters(request.form)
+    next_cursor = None
 
-        query = request.form.get("movie_name", "").strip()
-        print(f"DEBUG: Search query: '{query}'")
+    query = request.form.get("movie_name", "").strip()
+    log.debug("Search query: '%s'", query)
+    
+    if query:
+        # Import dynamically to avoid timing issues
+        from app.utils import find_multiple_close_rows
+        from app.recommendation import recommendation_page, recommend_fallback_tmdb
         
-        if query:
-            # Import dynamically to avoid timing issues
-            from app.utils import find_multiple_close_titles
-            from app.recommendation import recommend_from_dataset, recommend_fallback_tmdb
-            
-            matched_titles = find_multiple_close_titles(query, limit=3, threshold=82)
-            print(f"DEBUG: Matched titles: {matched_titles}")
-            
-            if matched_titles:
-                pool = []
-                for t in matched_titles:
-                    print(f"DEBUG: Getting recommendations for: {t}")
-                    recs = recommend_from_dataset(t, top_n=4, country=country)
-                    print(f"DEBUG: Recommendations for {t}: {len(recs)} found")
-                    pool.extend(recs)
-                
-                seen, out = set(), []
-                for c in pool:
-                    key = c.get("id") or c.get("title")
-                    if key not in seen:
-                        seen.add(key)
-                        out.append(c)
-                recommendations = out
-                print(f"DEBUG: Total unique recommendations: {len(recommendations)}")
-            else:
-                print("DEBUG: No close matches found, trying TMDB fallback")
-                recommendations = recommend_fallback_tmdb(query, top_n=8, country=country)
-                print(f"DEBUG: TMDB fallback recommendations: {len(recommendations)} found")
-                if not recommendations:
-                    not_found_message = "Sorry — couldn't find that movie in our dataset or on TMDB."
+        matched_rows = find_multiple_close_rows(query, limit=3, threshold=82)
+        log.debug("Matched rows: %s", matched_rows)
+        
+        if matched_rows:
+            # First page of the merged ranking; more pages load on demand
+            recommendations, next_cursor = recommendation_page(
+                matched_rows, filters, offset=0, limit=RECOMMENDATION_PAGE_SIZE, country=country
+            )
+            log.debug("First page recommendations: %d", len(recommendations))
+        else:
+            recommendations = recommend_fallback_tmdb(query, top_n=8, country=country, filters=filters)
+            log.debug("No close matches for '%s'; TMDB fallback found %d", query, len(recommendations))
+            if not recommendations:
+                not_found_message = "Sorry — couldn't find that movie in our dataset or on TMDB."
 
-    return render_template(
-        "index.html",
+    return render_index(
+        country,
         query=query,
-        country=country,
         recommendations=recommendations,
-        trending=trending,
         not_found_message=not_found_message,
-        user=current_user
+        filters=filters,
+        next_cursor=next_cursor
     )
+
+def render_index(country, query="", recommendations=(), not_found_message=None, filters=None, next_cursor=None):
+    with span("trending"):
+        trending = trending_cache.cards(country)
+    with span("render"):
+        return render_template(
+            "index.html",
+            query=query,
+            country=country,
+            recommendations=recommendations,
+            trending=trending,
+            not_found_message=not_found_message,
+            filters=filters or {},
+            genre_options=sorted(set(GENRE_KEYWORDS.values())),
+            next_cursor=next_cursor,
+            user=current_user
+        )
+
+def cached_index(country):
+    """The plain home page, from the page cache, with ETag/Last-Modified revalidation"""
+    logged_in = current_user.is_authenticated
+    with span("trending"):
+        version = trending_cache.refresh()
+    etag, body = cached_page(("index", country, logged_in, version), lambda: render_index(country))
+    
+    response = make_response(body)
+    response.set_etag(etag)
+    response.last_modified = trending_cache.updated_at
+    # Revalidate every time; the page differs by login state, which lives in the cookie
+    response.headers["Cache-Control"] = "private, no-cache" if logged_in else "public, no-cache"
+    response.vary.add("Cookie")
+    return response.make_conditional(request)
+
+@main_bp.route("/api/recommendations")
+@cached_response(max_age=60, private=True)
+def api_recommendations():
+    """API endpoint - JSON recommendations, one page at a time.
+    
+    Start with ?title= and optional filters (year_min, year_max, rating_min,
+    runtime_min, runtime_max, genre=... repeatable), then pass the returned
+    next_cursor as ?cursor= to get the following page.
+    """
+    if not current_user.is_authenticated:
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    country = request.args.get("country", "US")
+    limit = max(1, min(request.args.get("limit", RECOMMENDATION_PAGE_SIZE, type=int), 20))
+    
+    cursor = request.args.get("cursor")
+    if cursor:
+        decoded = decode_cursor(cursor)
+        if decoded is None:
+            return jsonify({"error": "Invalid cursor"}), 400
+        seed_rows, filters, offset = decoded
+        cards, next_cursor = recommendation_page(seed_rows, filters, offset, limit, country)
+        return jsonify({"recommendations": cards, "next_cursor": next_cursor})
+    
+    title = request.args.get("title", "").strip()
+    if not title:
+        return jsonify({"error": "Missing title"}), 400
+    filters = parse_filters(request.args)
+    
+    matched_rows = find_multiple_close_rows(title, limit=3, threshold=82)
+    if matched_rows:
+        cards, next_cursor = recommendation_page(matched_rows, filters, 0, limit, country)
+    else:
+        cards, next_cursor = recommend_fallback_tmdb(title, top_n=limit, country=country, filters=filters), None
+    
+    return jsonify({"title": title, "filters": filters, "recommendations": cards, "next_cursor": next_cursor})
+
 @main_bp.route("/suggest")
+@cached_response(max_age=300)
 def suggest():
     q = request.args.get("q", "").strip().lower()
     if not q:
@@ -85,11 +155,10 @@ def suggest():
     from app.utils import df
     
     if df is None:
-        print("DEBUG: Dataset not loaded for suggestions")
+        log.warning("Dataset not loaded for suggestions")
         return jsonify({"suggestions": []})
         
     titles = [t for t in df["title"].tolist() if q in t.lower()]
-    print(f"DEBUG: Suggestions for '{q}': {titles[:5]}")
     return jsonify({"suggestions": titles[:5]})
 
 
@@ -111,7 +180,10 @@ def debug_chats():
             "conversations_count": current_app.conversations_col.count_documents({"user_id": str(current_user.id)}),
             "chats_count": current_app.chats_col.count_documents({"user_id": str(current_user.id)}),
             "conversations": list(current_app.conversations_col.find({"user_id": str(current_user.id)}).sort("created_at", -1).limit(5)),
-            "chats": list(current_app.chats_col.find({"user_id": str(current_user.id)}).sort("created_at", -1).limit(5))
+            "chats": list(current_app.chats_col.find({"user_id": str(current_user.id)}).sort("created_at", -1).limit(5)),
+            # hits = user lookups served without a Mongo round trip
+            "user_cache": user_cache.stats(),
+            "poster_cache": poster_cache.stats()
         }
         
         # Convert ObjectId to string for JSON serialization
@@ -130,20 +202,22 @@ def debug_chats():
 def chat_history():
     """HTML page - displays chat history"""
     try:
-        # Fetch user's chats from database
-        conversations = current_app.conversations_col.find(
-            {"user_id": str(current_user.id)}
-        ).sort("updated_at", -1)
+        # Fetch one page of the user's chats, summaries only
+        try:
+            conversations, next_cursor = list_conversations(
+                str(current_user.id), request.args.get("after"), CHAT_HISTORY_PAGE_SIZE
+            )
+        except ValueError:
+            return redirect(url_for('main.chat_history'))
         
         # Convert to list for the template
         chat_list = []
         for conv in conversations:
-            messages = conv.get("messages", [])
+            last_msg = conv.get("last_message")
             last_message = "No messages"
             
-            if messages:
+            if last_msg:
                 # Get the last message (whether from user or bot)
-                last_msg = messages[-1]
                 if 'user' in last_msg and last_msg['user']:
                     last_message = f"You: {last_msg['user'][:50]}..."
                 elif 'bot' in last_msg and last_msg['bot']:
@@ -152,14 +226,14 @@ def chat_history():
             chat_list.append({
                 "id": str(conv["_id"]),
                 "date": conv["created_at"].strftime("%Y-%m-%d"),
-                "message_count": len(messages),
+                "message_count": conv["message_count"],
                 "last_message": last_message
             })
         
-        return render_template("conversations.html", chats=chat_list)
+        return render_template("conversations.html", chats=chat_list, next_cursor=next_cursor)
     except Exception as e:
-        print(f"ERROR fetching chats: {e}")
-        return render_template("conversations.html", chats=[])
+        log.exception("Error fetching chats: %s", e)
+        return render_template("conversations.html", chats=[], next_cursor=None)
 
 @main_bp.route("/conversation/<conversation_id>")
 @login_required
@@ -175,17 +249,21 @@ def view_conversation(conversation_id):
             flash("Conversation not found", "error")
             return redirect(url_for('main.chat_history'))
         
-        # Format the conversation data for template
+        # Newest page only; older pages are loaded by conversationDetail.js
+        messages, next_cursor = conversation_page(conversation)
+        message_count, _ = conversation_summary(conversation)
         formatted_conversation = {
             "id": str(conversation["_id"]),
             "date": conversation["created_at"].strftime("%Y-%m-%d %H:%M"),
-            "messages": conversation.get("messages", [])
+            "message_count": message_count,
+            "messages": messages,
+            "next_cursor": next_cursor
         }
         
         return render_template("conversation_detail.html", 
                              conversation=formatted_conversation)  # HTML response
         
     except Exception as e:
-        print(f"ERROR viewing conversation: {e}")
+        log.exception("Error viewing conversation: %s", e)
         flash("Error loading conversation", "error")
         return redirect(url_for('main.chat_history'))
\ No newline at end of file
@@ -48,24 +48,89 @@ async function sendMessage() {
     chatMessages.scrollTop = chatMessages.scrollHeight;
     
     try {
-        const response = await fetch('/chat', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({ message: message })
-        });
-        
-        const data = await response.json();
-        
-        // Remove typing indicator and add actual response
+        const reply = await streamReply(message, typingDiv);
         typingDiv.remove();
-        if (data.reply) {
-            addMessageToChat(data.reply, 'bot');
+        if (reply) {
+            addMessageToChat(reply, 'bot');
         }
-        
     } catch (error) {
-        console.error('Error:', error);
-        typingDiv.textContent = 'Sorry, I encountered an error. Please try again.';
+        console.warn('Streaming failed, falling back to /chat:', error);
+        try {
+            const reply = await fetchReply(message);
+            typingDiv.remove();
+            if (reply) {
+                addMessageToChat(reply, 'bot');
+            }
+        } catch (error) {
+            console.error('Error:', error);
+            typingDiv.textContent = 'Sorry, I encountered an error. Please try again.';
+        }
+    }
+}
+
+// Read /chat/stream (Server-Sent Events over a POST) and show each line as it
+// arrives in liveDiv. Resolves with the full reply from the "done" event.
+async function streamReply(message, liveDiv) {
+    const response = await fetch('/chat/stream', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream'
+        },
+        body: JSON.stringify({ message: message })
+    });
+    if (!response.ok || !response.body || !response.body.getReader) {
+        throw new Error('Streaming not available');
+    }
+    
+    const chatMessages = document.getElementById('chatMessages');
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let text = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        // Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const frame = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let event = 'message';
+            let data = '';
+            frame.split('\n').forEach(line => {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            });
+            const payload = data ? JSON.parse(data) : {};
+            
+            if (event === 'line') {
+                text += payload.text;
+                liveDiv.textContent = text;
+                chatMessages.scrollTop = chatMessages.scrollHeight;
+            } else if (event === 'done') {
+                return payload.reply;
+            }
+        }
+    }
+    if (!text) {
+        throw new Error('Stream ended without a reply');
     }
-}
\ No newline at end of file
+    return text;
+}
+
+async function fetchReply(message) {
+    const response = await fetch('/chat', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ message: message })
+    });
+    const data = await response.json();
+    return data.reply;
+}
@@ -18,8 +18,80 @@ document.addEventListener('DOMContentLoaded', function() {
             clearMessages(conversationId);
         });
     }
+
+    // Older messages are fetched one page at a time
+    const loadOlderBtn = document.getElementById('loadOlderBtn');
+    if (loadOlderBtn) {
+        loadOlderBtn.addEventListener('click', function() {
+            loadOlderMessages(this);
+        });
+    }
 });
 
+function loadOlderMessages(button) {
+    const conversationId = button.getAttribute('data-conversation-id');
+    const cursor = button.getAttribute('data-cursor');
+    const container = document.getElementById('conversationMessages');
+    const loadRow = document.getElementById('loadOlderRow');
+
+    button.disabled = true;
+    fetch(`/conversation/${conversationId}/messages?before=${encodeURIComponent(cursor)}`)
+        .then(response => response.json())
+        .then(data => {
+            if (data.error) {
+                throw new Error(data.error);
+            }
+
+            // Keep the current messages where they are on screen
+            const previousHeight = container.scrollHeight;
+            const fragment = document.createDocumentFragment();
+            data.messages.forEach(message => fragment.appendChild(buildMessageRow(message)));
+            loadRow.after(fragment);
+            container.scrollTop += container.scrollHeight - previousHeight;
+
+            if (data.next_cursor) {
+                button.setAttribute('data-cursor', data.next_cursor);
+                button.disabled = false;
+            } else {
+                loadRow.remove();
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            showAlert('Error loading older messages', 'error');
+            button.disabled = false;
+        });
+}
+
+// Same markup as the server-rendered messages in conversation_detail.html
+function buildMessageRow(message) {
+    const row = document.createElement('div');
+    row.className = 'message-row mb-3';
+
+    const addBubble = (text, isUser) => {
+        const wrapper = document.createElement('div');
+        wrapper.className = `d-flex justify-content-${isUser ? 'end' : 'start'} mb-2`;
+        const bubble = document.createElement('div');
+        bubble.className = isUser ? 'bg-primary text-white p-3 rounded' : 'bg-light p-3 rounded';
+        bubble.style.maxWidth = '80%';
+
+        const body = document.createElement('p');
+        body.className = 'mb-1';
+        body.textContent = text;
+        const time = document.createElement('small');
+        time.className = isUser ? 'opacity-75' : 'text-muted';
+        time.textContent = message.timestamp || '';
+
+        bubble.append(body, time);
+        wrapper.appendChild(bubble);
+        row.appendChild(wrapper);
+    };
+
+    if (message.user) addBubble(message.user, true);
+    if (message.bot) addBubble(message.bot, false);
+    return row;
+}
+
 function deleteConversation(conversationId) {
     if (confirm('Are you sure you want to delete this conversation?')) {
         fetch(`/delete_conversation/${conversationId}`, {
@@ -0,0 +1,182 @@
+"""Per-request stage timing.
+
+Wrap a stage in ``with span("tmdb"):`` (or decorate it with ``@timed("tmdb")``)
+and its wall time is added to the current request. Each response then carries
+a ``Server-Timing`` header (shown in the browser's network panel), e.g.::
+
+    Server-Timing: ipapi;dur=212.4, tmdb;dur=830.1;desc="9 calls", total;dur=1104.9
+
+When the request ends a record is built (``method``, ``path``, ``endpoint``,
+``status``, ``duration_ms`` and ``spans``, as ``{name: {"ms": ..., "count": ...}}``)
+and passed to every callback registered with ``on_record``. Records are also
+logged as ``TIMING {json}`` lines when ``TIMING_LOG_RECORDS`` is set and the
+request took at least ``TIMING_LOG_MIN_MS`` milliseconds.
+
+``METRICS_ENABLED`` also turns span collection on (for ``app.metrics``), but
+headers and log lines stay off unless ``TIMING_ENABLED`` is set. With both
+off, ``span`` returns a shared no-op context manager and no hooks are installed. Spans outside a request (background threads)
+are always ignored. Streamed responses send their header before the body
+runs, so only the record covers the streamed part.
+"""
+import json
+import logging
+import time
+from contextlib import nullcontext
+from functools import wraps
+from flask import g, has_request_context, request
+from pymongo import monitoring
+
+enabled = False
+_NULL_SPAN = nullcontext()
+_record_callbacks = []
+_send_header = False
+_log_records = True
+_log_min_ms = 0.0
+_mongo_listener = None
+
+log = logging.getLogger(__name__)
+
+
+class RequestTimer:
+    __slots__ = ("start", "spans")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans = {}  # name -> [total ms, count]
+
+    def add(self, name, ms):
+        entry = self.spans.get(name)
+        if entry is None:
+            self.spans[name] = [ms, 1]
+        else:
+            entry[0] += ms
+            entry[1] += 1
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+    def header(self):
+        parts = []
+        for name, (ms, count) in self.spans.items():
+            part = f"{name};dur={ms:.1f}"
+            if count > 1:
+                part += f';desc="{count} calls"'
+            parts.append(part)
+        parts.append(f"total;dur={self.elapsed_ms():.1f}")
+        return ", ".join(parts)
+
+
+class _Span:
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.add(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
+
+
+def current_timer():
+    """The timer of the request being handled, or None."""
+    if not enabled or not has_request_context():
+        return None
+    return g.get("_request_timer")
+
+
+def span(name):
+    """Context manager timing a stage of the current request."""
+    if not enabled:
+        return _NULL_SPAN
+    timer = current_timer()
+    return _Span(timer, name) if timer is not None else _NULL_SPAN
+
+
+def timed(name):
+    """Decorator form of ``span``."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def on_record(callback):
+    """Call ``callback(record)`` for every finished request."""
+    _record_callbacks.append(callback)
+    return callback
+
+
+class MongoTimingListener(monitoring.CommandListener):
+    """Adds every Mongo command run by the request thread to its ``mongo`` span."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        timer = current_timer()
+        if timer is not None:
+            timer.add("mongo", event.duration_micros / 1000)
+
+    def failed(self, event):
+        self.succeeded(event)
+
+
+def _start_timer():
+    g._request_timer = RequestTimer()
+
+
+def _add_header(response):
+    timer = g.get("_request_timer")
+    if timer is not None:
+        g._request_status = response.status_code
+        if _send_header:
+            response.headers["Server-Timing"] = timer.header()
+    return response
+
+
+def _finish_timer(exc):
+    timer = g.pop("_request_timer", None)
+    if timer is None:
+        return
+    record = {
+        "method": request.method,
+        "path": request.path,
+        "endpoint": request.endpoint,
+        "status": g.get("_request_status", 500),
+        "duration_ms": round(timer.elapsed_ms(), 1),
+        "spans": {name: {"ms": round(ms, 1), "count": count} for name, (ms, count) in timer.spans.items()},
+    }
+    if _log_records and record["duration_ms"] >= _log_min_ms and log.isEnabledFor(logging.INFO):
+        log.info("TIMING %s", json.dumps(record), extra={"timing": record})
+    for callback in _record_callbacks:
+        try:
+            callback(record)
+        except Exception as e:
+            log.exception("Error in timing callback: %s", e)
+
+
+def init_timing(app):
+    """Install the request hooks. Call before creating the MongoClient so its commands are timed."""
+    global enabled, _send_header, _log_records, _log_min_ms, _mongo_listener
+    _send_header = app.config.get("TIMING_ENABLED", False)
+    enabled = _send_header or app.config.get("METRICS_ENABLED", False)
+    _log_records = _send_header and app.config.get("TIMING_LOG_RECORDS", True)
+    _log_min_ms = app.config.get("TIMING_LOG_MIN_MS", 0)
+    if not enabled:
+        return
+    app.before_request(_start_timer)
+    app.after_request(_add_header)
+    app.teardown_request(_finish_timer)
+    if _mongo_listener is None:
+        _mongo_listener = MongoTimingListener()
+        monitoring.register(_mongo_listener)
+    if _send_header:
+        log.info("Request timing enabled (Server-Timing headers)")
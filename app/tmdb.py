@@ -1,22 +1,33 @@
 from flask import current_app
 from app.utils import safe_get, is_blocked_movie
+from app.images import poster_url, poster_srcset
+from app.timing import timed
+from app.metrics import observe_tmdb
+import logging
 import requests
+import time
+
+log = logging.getLogger(__name__)
 
 TMDB_BASE = "https://api.themoviedb.org/3"
-TMDB_IMAGE_BASE = "https://image.tmdb.org/t/p/w500"
 
+@timed("tmdb")
 def tmdb_request(endpoint: str, api_key: str, params=None):
     """Helper to call TMDB API safely."""
     url = f"https://api.themoviedb.org/3/{endpoint}"
     if params is None:
         params = {}
     params["api_key"] = api_key
+    start = time.perf_counter()
     try:
         resp = requests.get(url, params=params, timeout=10)
         resp.raise_for_status()
-        return resp.json()
+        data = resp.json()
+        observe_tmdb(endpoint, time.perf_counter() - start)
+        return data
     except Exception as e:
-        print(f"[TMDB ERROR] {e}")
+        observe_tmdb(endpoint, time.perf_counter() - start, error=e)
+        log.error("TMDB %s failed: %s", endpoint, e)
         return {}
 
 def search_movie(title, api_key=None, language="en-US"):
@@ -121,13 +132,13 @@ def make_card_from_tmdb_obj(tmdb_movie_obj: dict, country: str = "US"):
         return None
 
     poster_path = details.get("poster_path")
-    poster_url = f"{TMDB_IMAGE_BASE}{poster_path}" if poster_path else None
     genres = [g.get("name") for g in details.get("genres", []) if g.get("name")]
 
     return {
         "id": movie_id,
         "title": title,
-        "poster": poster_url,
+        "poster": poster_url(poster_path),
+        "poster_srcset": poster_srcset(poster_path),
         "overview": overview,
         "rating": details.get("vote_average"),
         "release_date": details.get("release_date"),
@@ -0,0 +1,228 @@
+"""Translation service for the chatbot.
+
+Language detection runs locally with ``langdetect`` so English messages never
+leave the process. Translations go through a pluggable backend, are cached in
+an in-process LRU plus an optional SQLite file shared by all workers, and
+every backend call is bounded by a time budget: if the backend is slow the
+caller gets the original text back immediately instead of blocking the
+request (the late result still lands in the cache for next time).
+"""
+import logging
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from flask import current_app, has_app_context
+from langdetect import detect, DetectorFactory, LangDetectException
+
+# Set deterministic language detection
+DetectorFactory.seed = 0
+
+ASCII_TEXT = re.compile(r'^[a-zA-Z0-9\s\.,!?@#$%^&*()_+\-=\'"]*$')
+
+log = logging.getLogger(__name__)
+
+
+# -----------------------------
+# Backends
+# -----------------------------
+class GoogleBackend:
+    """Google Translate through deep-translator (network)."""
+    name = "google"
+
+    def translate(self, text, source, target):
+        from deep_translator import GoogleTranslator
+        return GoogleTranslator(source=source, target=target).translate(text)
+
+
+class OfflineBackend:
+    """Local stub that returns the text unchanged; for tests and offline use."""
+    name = "offline"
+
+    def translate(self, text, source, target):
+        return text
+
+
+BACKENDS = {
+    GoogleBackend.name: GoogleBackend,
+    OfflineBackend.name: OfflineBackend,
+}
+
+
+def register_backend(name, backend_cls):
+    """Make a backend class available to ``TRANSLATION_BACKEND``."""
+    BACKENDS[name] = backend_cls
+
+
+# -----------------------------
+# Cache
+# -----------------------------
+class TranslationCache:
+    """LRU cache keyed by (source, target, text), backed by SQLite if a path is given.
+
+    The lock only guards the in-memory LRU; SQLite is read and written outside
+    it, through one connection per thread, so a slow disk never makes other
+    requests wait for their cache hits.
+    """
+
+    def __init__(self, max_size=2048, path=None):
+        self.max_size = max_size
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _db(self):
+        # One connection per thread and process: SQLite handles must not cross a fork
+        if not self.path:
+            return None
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=1)
+            # WAL lets readers in every worker proceed while one of them writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "source TEXT, target TEXT, text TEXT, translated TEXT, "
+                "PRIMARY KEY (source, target, text))"
+            )
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, source, target, text):
+        key = (source, target, text)
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return self._lru[key]
+        try:
+            db = self._db()
+            row = db.execute(
+                "SELECT translated FROM translations WHERE source=? AND target=? AND text=?", key
+            ).fetchone() if db else None
+        except sqlite3.Error as e:
+            log.error("Error reading translation cache: %s", e)
+            row = None
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, row[0])
+        return row[0]
+
+    def set(self, source, target, text, translated):
+        key = (source, target, text)
+        with self._lock:
+            self._remember(key, translated)
+        try:
+            db = self._db()
+            if db:
+                with db:  # commits, or rolls back on error
+                    db.execute("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)", key + (translated,))
+        except sqlite3.Error as e:
+            log.error("Error writing translation cache: %s", e)
+
+    def _remember(self, key, value):
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+
+# -----------------------------
+# Service
+# -----------------------------
+class TranslationService:
+    def __init__(self, backend, cache, timeout=1.5, workers=4):
+        self.backend = backend
+        self.cache = cache
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="translate")
+
+    def detect(self, text):
+        """Detect the language locally; plain ASCII is treated as English."""
+        if not text or ASCII_TEXT.match(text):
+            return "en"
+        try:
+            return detect(text)
+        except LangDetectException:
+            return "en"
+
+    def translate(self, text, source, target):
+        """Translate within the time budget; returns the original text on failure."""
+        if not text or source == target:
+            return text
+
+        cached = self.cache.get(source, target, text)
+        if cached is not None:
+            return cached
+
+        future = self._executor.submit(self.backend.translate, text, source, target)
+        future.add_done_callback(lambda f: self._store(f, source, target, text))
+        try:
+            return future.result(timeout=self.timeout) or text
+        except FutureTimeout:
+            log.warning("%s translation exceeded %ss, using original text", self.backend.name, self.timeout)
+        except Exception as e:
+            log.error("%s translation failed: %s", self.backend.name, e)
+        return text
+
+    def _store(self, future, source, target, text):
+        if future.cancelled() or future.exception() is not None:
+            return
+        translated = future.result()
+        if translated:
+            self.cache.set(source, target, text, translated)
+
+    def to_english(self, text):
+        """Return ``(english_text, detected_lang)``."""
+        lang = self.detect(text)
+        if lang == "en":
+            return text, "en"
+        return self.translate(text, lang, "en"), lang
+
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def _build_service(config):
+    name = config.get("TRANSLATION_BACKEND", "google")
+    backend_cls = BACKENDS.get(name)
+    if backend_cls is None:
+        log.error("Unknown translation backend '%s', using offline", name)
+        backend_cls = OfflineBackend
+    cache = TranslationCache(config.get("TRANSLATION_CACHE_SIZE", 2048),
+                             config.get("TRANSLATION_CACHE_PATH") or None)
+    return TranslationService(backend_cls(), cache, timeout=config.get("TRANSLATION_TIMEOUT", 1.5))
+
+
+def init_translation(app):
+    """Build the service from ``TRANSLATION_*`` in ``app.config``."""
+    global _service
+    with _service_lock:
+        if _service is not None:
+            _service.close()
+        _service = _build_service(app.config)
+    return _service
+
+
+def get_translation_service():
+    """Process-wide service set up by ``init_translation`` (built from the current app if it wasn't)."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = _build_service(current_app.config if has_app_context() else {})
+    return _service
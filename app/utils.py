@@ -1,39 +1,49 @@
 import re
 import requests
+import numpy as np
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import TfidfVectorizer, ENGLISH_STOP_WORDS
 from sklearn.metrics.pairwise import linear_kernel
 from rapidfuzz import process
 from flask import request, current_app
 from functools import lru_cache
 from flask_mail import Message
+import hashlib
+import logging
 import os
+import time
+import threading
+from collections import OrderedDict
 from app import mail
+from app.timing import span
+from app.metrics import record_load_time
+
+log = logging.getLogger(__name__)
 
 def send_email(recipient, subject, body, html=False):
     try:
         from flask_mail import Message
         from flask import current_app
         
-        print(f"DEBUG: Attempting to send email to {recipient}")
-        
         # Get mail instance from current app extensions
         mail = current_app.extensions.get('mail')
         if mail is None:
-            print("ERROR: Mail extension not found")
+            log.error("Mail extension not found")
             return False
             
-        # Check if email credentials are configured
-        if not current_app.config.get('MAIL_USERNAME') or not current_app.config.get('MAIL_PASSWORD'):
-            print("ERROR: Email credentials not configured")
+        # Check if email credentials are configured (a local SMTP sink needs none)
+        has_credentials = current_app.config.get('MAIL_USERNAME') and current_app.config.get('MAIL_PASSWORD')
+        uses_tls = current_app.config.get('MAIL_USE_TLS') or current_app.config.get('MAIL_USE_SSL')
+        if uses_tls and not has_credentials:
+            log.error("Email credentials not configured")
             return False
             
         # Use the email from config or default
-        sender_email = current_app.config.get('MAIL_USERNAME', 'noreply@movieapp.com')
+        sender_email = (current_app.config.get('MAIL_USERNAME')
+                        or current_app.config.get('MAIL_DEFAULT_SENDER')
+                        or 'noreply@movieapp.com')
         sender_name = current_app.config.get('MAIL_DEFAULT_SENDER_NAME', 'Movie App')
         
-        print(f"DEBUG: Sending from {sender_email} to {recipient}")
-        
         # Create message
         msg = Message(
             subject=subject,
@@ -61,78 +71,283 @@ def send_email(recipient, subject, body, html=False):
         else:
             msg.body = body
             
-        # Send the message
+        # Hand off to the background queue if it is running, otherwise send now
+        mail_queue = getattr(current_app, 'mail_queue', None)
+        if mail_queue is not None:
+            mail_queue.submit(msg)
+            log.debug("Email %r queued", subject)
+            return True
+        
         mail.send(msg)
-        print(f"DEBUG: Email sent successfully to {recipient}")
+        log.debug("Email %r sent", subject)
         return True
         
     except Exception as e:
-        print(f"ERROR sending email: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error sending email: %s", e)
         return False
 
 # Initialize dataset (will be loaded once)
 df = None
 tfidf_matrix = None
+# Normalized title -> row position, for entity lookups without fuzzy matching or TMDB
+title_index = {}
+max_title_tokens = 0
+# Facet token (genre, keyword, ...) -> sorted popularity ranks of the rows that have it
+facet_index = {}
+# Popularity rank -> row position (rank 0 is the most popular movie)
+rank_order = None
+# Columnar numeric fields for vectorized filtering (NaN where unknown)
+catalog = {}
+# Content hash of the loaded file: the same in every worker and across restarts,
+# different as soon as the file changes (row positions then mean other movies)
+dataset_version = None
+
+def file_version(path, chunk_size=1 << 20):
+    """Short SHA-1 of a file's contents."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
 
 def load_dataset(data_path):
-    global df, tfidf_matrix
+    global df, tfidf_matrix, title_index, max_title_tokens, facet_index, rank_order, catalog, dataset_version
+    start = time.perf_counter()
+    dataset_version = None
     try:
         if data_path is None:
             data_path = 'data/movies_with_features.xlsx' 
             
-        print(f"DEBUG: Trying to load dataset from: {data_path}")
+        log.debug("Trying to load dataset from: %s", data_path)
         
         # Check if file exists
         if not os.path.exists(data_path):
-            print(f"ERROR: Dataset file not found at: {data_path}")
+            log.error("Dataset file not found at: %s", data_path)
             df = None
             tfidf_matrix = None
             return False
             
+        version = file_version(data_path)
+        
         # Load the dataset
         if data_path.endswith('.xlsx'):
             df = pd.read_excel(data_path)
         elif data_path.endswith('.csv'):
             df = pd.read_csv(data_path)
         else:
-            print(f"ERROR: Unsupported file format: {data_path}")
+            log.error("Unsupported dataset file format: %s", data_path)
             df = None
             tfidf_matrix = None
             return False
             
-        print(f"DEBUG: Dataset loaded with {len(df)} rows")
-        print(f"DEBUG: Dataset columns: {df.columns.tolist()}")
+        log.debug("Dataset loaded with %d rows, columns: %s", len(df), df.columns.tolist())
         
         # Check if required columns exist
         if 'title' not in df.columns:
-            print("ERROR: Dataset missing 'title' column")
+            log.error("Dataset missing 'title' column")
             df = None
             tfidf_matrix = None
             return False
             
         if 'combined_features' not in df.columns:
-            print("WARNING: Dataset missing 'combined_features' column, creating dummy column")
+            log.warning("Dataset missing 'combined_features' column, using titles instead")
             df['combined_features'] = df['title']  # Use title as fallback
             
         df["title"] = df["title"].astype(str)
         df["title_clean"] = df["title"].str.strip().str.lower()
         
+        title_index, max_title_tokens = build_title_index(df)
+        log.debug("Title index built with %d titles", len(title_index))
+        
+        facet_index, rank_order = build_facet_index(df)
+        log.debug("Facet index built with %d facets", len(facet_index))
+        
+        catalog = build_catalog_columns(df)
+        
         # Create TF-IDF matrix
         tfidf = TfidfVectorizer(stop_words="english")
         combined = df["combined_features"].fillna("")
         tfidf_matrix = tfidf.fit_transform(combined)
         
-        print("DEBUG: TF-IDF matrix created successfully")
+        log.debug("TF-IDF matrix created")
+        dataset_version = version
+        record_load_time("dataset", time.perf_counter() - start)
         return True
         
     except Exception as e:
-        print(f"ERROR loading dataset: {e}")
+        log.exception("Error loading dataset: %s", e)
         df = None
         tfidf_matrix = None
+        title_index, max_title_tokens = {}, 0
+        facet_index, rank_order = {}, None
+        catalog = {}
         return False
 
+_WORD_RE = re.compile(r"\w+")
+
+def normalize_title(text) -> str:
+    """Lowercase, drop apostrophes and punctuation, collapse whitespace."""
+    text = str(text).lower().replace("'", "").replace("\u2019", "")
+    return " ".join(_WORD_RE.findall(text))
+
+def build_title_index(frame):
+    """Map normalized titles to row positions, keeping the most popular duplicate."""
+    keys = frame["title"].map(normalize_title)
+    if "popularity" in frame.columns:
+        order = pd.to_numeric(frame["popularity"], errors="coerce").fillna(0).to_numpy().argsort(kind="stable")[::-1]
+    else:
+        order = range(len(frame))
+    
+    index = {}
+    longest = 0
+    for pos in order:
+        key = keys.iat[pos]
+        if key and key not in index:
+            index[key] = int(pos)
+            longest = max(longest, key.count(" ") + 1)
+    return index, longest
+
+def popularity_rank_order(frame):
+    """Row positions sorted by popularity, then vote_average, both descending."""
+    def column(name):
+        if name not in frame.columns:
+            return np.zeros(len(frame))
+        return pd.to_numeric(frame[name], errors="coerce").fillna(0).to_numpy()
+    return np.lexsort((-column("vote_average"), -column("popularity")))
+
+def build_facet_index(frame):
+    """Inverted index from genre/feature tokens to popularity ranks.
+    
+    Rows are visited in popularity order, so every posting array comes out
+    sorted by rank and intersections stay sorted with no re-ranking.
+    """
+    order = popularity_rank_order(frame)
+    text = frame["combined_features"].fillna("").astype(str)
+    if "genres" in frame.columns:
+        text = frame["genres"].fillna("").astype(str) + " " + text
+    
+    postings = {}
+    for rank, pos in enumerate(order):
+        for token in set(_WORD_RE.findall(text.iat[pos].lower())):
+            if token not in ENGLISH_STOP_WORDS and (len(token) > 2 or token.isdigit()):
+                postings.setdefault(token, []).append(rank)
+    
+    index = {token: np.asarray(ranks, dtype=np.int32) for token, ranks in postings.items()}
+    return index, order.astype(np.int32)
+
+def _facet_ranks(facet):
+    """Sorted ranks of rows matching one facet phrase ("science fiction")."""
+    tokens = _WORD_RE.findall(facet.lower())
+    if not tokens:
+        return None
+    ranks = None
+    for token in tokens:
+        posting = facet_index.get(token)
+        if posting is None:
+            ranks = None
+            break
+        ranks = posting if ranks is None else np.intersect1d(ranks, posting, assume_unique=True)
+    if ranks is None and len(tokens) > 1:
+        # Some datasets squash multi-word genres ("ScienceFiction")
+        ranks = facet_index.get("".join(tokens))
+    return ranks
+
+def rows_with_facets(facets, limit=None):
+    """Row positions having every facet, most popular first."""
+    if rank_order is None or not facets:
+        return np.empty(0, dtype=np.int32)
+    ranks = None
+    for facet in facets:
+        matched = _facet_ranks(facet)
+        if matched is None:
+            return np.empty(0, dtype=np.int32)
+        ranks = matched if ranks is None else np.intersect1d(ranks, matched, assume_unique=True)
+    if limit is not None:
+        ranks = ranks[:limit]
+    return rank_order[ranks]
+
+def build_catalog_columns(frame):
+    """Float arrays for the filterable fields; missing columns are left out."""
+    columns = {}
+    for name in ("vote_average", "runtime", "popularity"):
+        if name in frame.columns:
+            columns[name] = pd.to_numeric(frame[name], errors="coerce").to_numpy(dtype=float)
+    if "release_date" in frame.columns:
+        columns["year"] = pd.to_datetime(frame["release_date"], errors="coerce").dt.year.to_numpy(dtype=float)
+    return columns
+
+# Filter name -> (catalog column, comparison)
+RANGE_FILTERS = {
+    "year_min": ("year", np.greater_equal),
+    "year_max": ("year", np.less_equal),
+    "rating_min": ("vote_average", np.greater_equal),
+    "runtime_min": ("runtime", np.greater_equal),
+    "runtime_max": ("runtime", np.less_equal),
+}
+
+def parse_filters(params):
+    """Read recommendation filters from request args/form; blank or invalid values are ignored."""
+    filters = {}
+    for name in RANGE_FILTERS:
+        value = (params.get(name) or "").strip()
+        try:
+            if value:
+                filters[name] = float(value)
+        except ValueError:
+            pass
+    genres = [g.strip() for g in params.getlist("genre") if g.strip()] if hasattr(params, "getlist") \
+        else [g for g in params.get("genre", []) if g]
+    if genres:
+        filters["genres"] = genres
+    return filters
+
+def filter_mask(filters):
+    """Boolean row mask for ``filters`` over the catalog columns, or None if unfiltered.
+    
+    Rows with an unknown value fail a filter on that field. Filters on a field
+    the dataset does not have are ignored.
+    """
+    if df is None or not filters:
+        return None
+    mask = np.ones(len(df), dtype=bool)
+    for name, (column, compare) in RANGE_FILTERS.items():
+        if name in filters and column in catalog:
+            with np.errstate(invalid="ignore"):
+                mask &= compare(catalog[column], filters[name])
+    if filters.get("genres"):
+        genre_mask = np.zeros(len(df), dtype=bool)
+        genre_mask[rows_with_facets(filters["genres"])] = True
+        mask &= genre_mask
+    return mask
+
+# Words that never make a title match on their own ("it", "up", "movie", ...)
+TITLE_NOISE_WORDS = frozenset(ENGLISH_STOP_WORDS) | {
+    "movie", "movies", "film", "films", "watch", "good", "rating", "rated",
+    "popular", "plot", "story", "tell", "like", "recommend", "similar",
+}
+
+def find_title_in_text(text):
+    """Find the longest catalog title mentioned in ``text``.
+    
+    Returns ``(row_position, remaining_text)`` where ``remaining_text`` is the
+    query with the title removed, or ``(None, normalized_text)`` if no title
+    was found.
+    """
+    tokens = normalize_title(text).split()
+    if not title_index or not tokens:
+        return None, " ".join(tokens)
+    
+    for n in range(min(max_title_tokens, len(tokens)), 0, -1):
+        for i in range(len(tokens) - n + 1):
+            span = tokens[i:i + n]
+            # Common words only count when they are the whole message
+            if n < len(tokens) and all(t in TITLE_NOISE_WORDS for t in span):
+                continue
+            row = title_index.get(" ".join(span))
+            if row is not None:
+                return row, " ".join(tokens[:i] + tokens[i + n:])
+    return None, " ".join(tokens)
+
 # Content filtering
 BLOCKED_PATTERN = re.compile(r"\b(sex|porn|xxx|erotic)\b", re.IGNORECASE)
 
@@ -157,11 +372,35 @@ def safe_get(url, params=None, timeout=8):
     except Exception:
         return {}
 
+# Client IP -> (expires_at, country code); lookups go to ipapi.co over the network
+_country_cache = OrderedDict()
+_country_lock = threading.Lock()
+COUNTRY_CACHE_SIZE = 10000
+# Failed lookups (rate limits, private IPs) are retried after this many seconds
+COUNTRY_FAILURE_TTL = 300
+
 def get_user_country_guess():
     try:
-        ip = request.headers.get("X-Forwarded-For", request.remote_addr)
-        data = safe_get(f"https://ipapi.co/{ip}/json/")
-        return data.get("country_code", "US")
+        forwarded = request.headers.get("X-Forwarded-For", request.remote_addr) or ""
+        ip = forwarded.split(",")[0].strip()
+        now = time.monotonic()
+        with _country_lock:
+            cached = _country_cache.get(ip)
+            if cached and cached[0] > now:
+                _country_cache.move_to_end(ip)
+                return cached[1]
+        
+        with span("ipapi"):
+            data = safe_get(f"https://ipapi.co/{ip}/json/")
+        country = data.get("country_code")
+        ttl = current_app.config.get("COUNTRY_CACHE_TTL", 86400) if country else COUNTRY_FAILURE_TTL
+        country = country or "US"
+        with _country_lock:
+            _country_cache[ip] = (now + ttl, country)
+            _country_cache.move_to_end(ip)
+            while len(_country_cache) > COUNTRY_CACHE_SIZE:
+                _country_cache.popitem(last=False)
+        return country
     except Exception:
         return "US"
 
@@ -178,25 +417,25 @@ def runtime_to_hm(runtime_minutes):
 
 # Recommendation utilities
 def find_multiple_close_titles(query: str, limit=3, threshold=80):
+    return [df.iloc[idx]["title"] for idx in find_multiple_close_rows(query, limit, threshold)]
+
+def find_multiple_close_rows(query: str, limit=3, threshold=80):
+    """Row positions of the dataset titles closest to ``query``."""
     if df is None:
-        print("DEBUG: Dataset is None in find_multiple_close_titles")
+        log.debug("Dataset is None in find_multiple_close_rows")
         return []
         
-    matches = process.extract(query.lower(), df["title_clean"].tolist(), limit=limit)
-    picks = []
-    for match_title, score, idx in matches:
-        if score >= threshold:
-            picks.append(df.iloc[idx]["title"])  
-    return picks
+    with span("fuzzy"):
+        matches = process.extract(query.lower(), df["title_clean"].tolist(), limit=limit)
+    return [idx for match_title, score, idx in matches if score >= threshold]
 
 # Add a function to check dataset status
 def check_dataset_status():
     """Check if dataset is loaded properly"""
     if df is None:
-        print("DEBUG: df is None")
+        log.debug("df is None")
         return False
     if tfidf_matrix is None:
-        print("DEBUG: tfidf_matrix is None")
+        log.debug("tfidf_matrix is None")
         return False
-    print("DEBUG: Dataset and TF-IDF matrix are loaded")
     return True
\ No newline at end of file
@@ -16,10 +16,77 @@ class Config:
     MAIL_USERNAME = os.getenv('MAIL_USERNAME')
     MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.getenv('MAIL_DEFAULT_SENDER')
+    # Background delivery: worker threads, retries with exponential backoff, idle SMTP timeout
+    MAIL_QUEUE_ENABLED = os.getenv('MAIL_QUEUE_ENABLED', 'True').lower() == 'true'
+    MAIL_WORKERS = int(os.getenv('MAIL_WORKERS', 2))
+    MAIL_MAX_RETRIES = int(os.getenv('MAIL_MAX_RETRIES', 4))
+    MAIL_RETRY_BACKOFF = float(os.getenv('MAIL_RETRY_BACKOFF', 2.0))
+    MAIL_IDLE_TIMEOUT = float(os.getenv('MAIL_IDLE_TIMEOUT', 30))
     
     # Chatbot Model Paths (Updated paths)
     #CHATBOT_MODEL_PATH = os.getenv('CHATBOT_MODEL_PATH', 'chatbot_model/chatbot_model')
 
     CHATBOT_MODEL_PATH = os.getenv('CHATBOT_MODEL_PATH', 'chatbot_model')
     QA_DATASET_PATH = os.getenv('QA_DATASET_PATH', 'chatbot_model/qa_dataset.pkl')
-    QA_EMBEDDINGS_PATH = os.getenv('QA_EMBEDDINGS_PATH', 'chatbot_model/qa_embeddings.pt')
\ No newline at end of file
+    QA_EMBEDDINGS_PATH = os.getenv('QA_EMBEDDINGS_PATH', 'chatbot_model/qa_embeddings.pt')
+    # Memory-mapped Q&A store written by scripts/generate_qa_embeddings.py
+    QA_STORE_PATH = os.getenv('QA_STORE_PATH', 'chatbot_model/qa_store')
+    # Approximate search over the store: more probes/rerank = better recall, more work
+    QA_ANN_ENABLED = os.getenv('QA_ANN_ENABLED', 'True').lower() == 'true'
+    QA_ANN_NPROBE = int(os.getenv('QA_ANN_NPROBE', 8))
+    QA_ANN_RERANK = int(os.getenv('QA_ANN_RERANK', 50))
+    
+    # Chatbot translation: backend name (google, offline), time budget in seconds and caches
+    TRANSLATION_BACKEND = os.getenv('TRANSLATION_BACKEND', 'google')
+    TRANSLATION_TIMEOUT = float(os.getenv('TRANSLATION_TIMEOUT', 1.5))
+    TRANSLATION_CACHE_SIZE = int(os.getenv('TRANSLATION_CACHE_SIZE', 2048))
+    TRANSLATION_CACHE_PATH = os.getenv('TRANSLATION_CACHE_PATH', 'chatbot_model/translations.sqlite3')
+    
+    # Precomputed chatbot fallback and genre lists (0 hours disables the refresher)
+    CURATED_LISTS_PATH = os.getenv('CURATED_LISTS_PATH', 'data/curated_lists.json')
+    CURATED_REFRESH_HOURS = float(os.getenv('CURATED_REFRESH_HOURS', 24))
+    
+    # Chat messages are stored in buckets of this many messages
+    CONVERSATION_BUCKET_SIZE = int(os.getenv('CONVERSATION_BUCKET_SIZE', 50))
+    # Queue conversation saves and write them in batches off the request thread
+    CONVERSATION_WRITE_BEHIND = os.getenv('CONVERSATION_WRITE_BEHIND', 'False').lower() == 'true'
+    CONVERSATION_BATCH_SIZE = int(os.getenv('CONVERSATION_BATCH_SIZE', 100))
+    CONVERSATION_FLUSH_INTERVAL = float(os.getenv('CONVERSATION_FLUSH_INTERVAL', 0.5))
+    
+    # Logged-in users are cached per process for this many seconds (0 disables)
+    USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', 60))
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 1024))
+    
+    # bcrypt cost (pick with scripts/benchmark_bcrypt.py) and the hashing process pool
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_CONCURRENCY = int(os.getenv('PASSWORD_HASH_CONCURRENCY', 4))
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv('PASSWORD_HASH_QUEUE_TIMEOUT', 5))
+    
+    # Home page caching: trending refresh interval, rendered pages kept, IP -> country lookups
+    TRENDING_TTL = int(os.getenv('TRENDING_TTL', 1800))
+    PAGE_CACHE_SIZE = int(os.getenv('PAGE_CACHE_SIZE', 64))
+    COUNTRY_CACHE_TTL = int(os.getenv('COUNTRY_CACHE_TTL', 86400))
+    
+    # Poster proxy: origin (http(s):// or file:// stand-in), local cache of resized posters
+    POSTER_PROXY_ENABLED = os.getenv('POSTER_PROXY_ENABLED', 'True').lower() == 'true'
+    POSTER_ORIGIN = os.getenv('POSTER_ORIGIN', 'https://image.tmdb.org/t/p')
+    POSTER_CACHE_DIR = os.getenv('POSTER_CACHE_DIR', 'data/poster_cache')
+    POSTER_CACHE_MAX_MB = float(os.getenv('POSTER_CACHE_MAX_MB', 512))
+    
+    # Server-Timing headers and per-request stage records (TIMING {json} log lines)
+    TIMING_ENABLED = os.getenv('TIMING_ENABLED', 'False').lower() == 'true'
+    TIMING_LOG_RECORDS = os.getenv('TIMING_LOG_RECORDS', 'True').lower() == 'true'
+    TIMING_LOG_MIN_MS = float(os.getenv('TIMING_LOG_MIN_MS', 0))
+    
+    # Prometheus /metrics; with several worker processes set METRICS_DIR to a shared directory
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'False').lower() == 'true'
+    METRICS_DIR = os.getenv('METRICS_DIR', '')
+    METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+    
+    # Logging: level, text or json lines, share of per-item debug lines kept, per-message rate limit
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+    LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', 0.01))
+    LOG_RATE_LIMIT = int(os.getenv('LOG_RATE_LIMIT', 20))
+    LOG_RATE_WINDOW = float(os.getenv('LOG_RATE_WINDOW', 60))
\ No newline at end of file
@@ -0,0 +1,43 @@
+# benchmark_bcrypt.py
+"""Time bcrypt at each cost factor and suggest BCRYPT_LOG_ROUNDS for a target latency."""
+import argparse
+import statistics
+import time
+import bcrypt
+
+def time_rounds(rounds, samples):
+    """Median seconds for one hash at ``rounds`` (a check costs the same)"""
+    salt = bcrypt.gensalt(rounds=rounds, prefix=b"2b")
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        bcrypt.hashpw(b"correct horse battery staple", salt)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def pick_rounds(target_ms, min_rounds=10, max_rounds=16, samples=3):
+    """Highest cost whose median hash time stays within ``target_ms``"""
+    print(f"{'rounds':>6} {'ms/hash':>9}")
+    best = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        ms = time_rounds(rounds, samples) * 1000
+        print(f"{rounds:>6} {ms:>9.1f}")
+        if ms > target_ms:
+            break
+        best = rounds
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--target-ms", type=float, default=250, help="acceptable time for one hash/check")
+    parser.add_argument("--min-rounds", type=int, default=10, help="never suggest less than this")
+    parser.add_argument("--max-rounds", type=int, default=16)
+    parser.add_argument("--samples", type=int, default=3)
+    args = parser.parse_args()
+    
+    rounds = pick_rounds(args.target_ms, args.min_rounds, args.max_rounds, args.samples)
+    print(f"\n✅ BCRYPT_LOG_ROUNDS={rounds} for a {args.target_ms:.0f} ms target on this machine")
+    print("Existing hashes are upgraded to the new cost the next time each user logs in.")
+
+if __name__ == "__main__":
+    main()
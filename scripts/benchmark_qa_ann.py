@@ -0,0 +1,57 @@
+# benchmark_qa_ann.py
+"""Measure recall@k and latency of the IVF index against exact search."""
+import argparse
+import sys
+import time
+from pathlib import Path
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.qa_store import load_qa_store
+from app.ann import IVFIndex, exact_search
+
+def make_queries(embeddings, n, noise, seed=0):
+    """Perturbed copies of random stored rows, so queries are realistic but not exact hits"""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(embeddings.shape[0], min(n, embeddings.shape[0]), replace=False)
+    queries = np.asarray(embeddings[np.sort(rows)], dtype=np.float32)
+    queries += noise * rng.standard_normal(queries.shape).astype(np.float32) / np.sqrt(queries.shape[1])
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+def benchmark(store_dir, n_queries=200, k=3, nprobes=(1, 2, 4, 8, 16, 32), rerank=50, noise=0.5):
+    _, _, embeddings, meta = load_qa_store(store_dir)
+    index = IVFIndex(store_dir, expected_count=meta["count"])
+    queries = make_queries(embeddings, n_queries, noise)
+    
+    start = time.perf_counter()
+    truth = [set(exact_search(embeddings, q, k)[0].tolist()) for q in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    
+    print(f"📊 {embeddings.shape[0]} rows, {index.meta['lists']} lists, pq_m={index.meta['pq_m']}, "
+          f"{len(queries)} queries")
+    print(f"exact search: {exact_ms:.2f} ms/query")
+    print(f"{'nprobe':>6} {'recall@' + str(k):>9} {'ms/query':>9} {'speedup':>8}")
+    
+    results = []
+    for nprobe in nprobes:
+        hits = 0
+        start = time.perf_counter()
+        for q, expected in zip(queries, truth):
+            found, _ = index.search(embeddings, q, top_k=k, nprobe=nprobe, rerank=rerank)
+            hits += len(expected & set(found.tolist()))
+        ann_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        recall = hits / (k * len(queries))
+        results.append((nprobe, recall, ann_ms))
+        print(f"{nprobe:>6} {recall:>9.3f} {ann_ms:>9.2f} {exact_ms / ann_ms:>7.1f}x")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--store', default='chatbot_model/qa_store')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('-k', type=int, default=3)
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--rerank', type=int, default=50)
+    parser.add_argument('--noise', type=float, default=0.5, help="query perturbation relative to a unit vector")
+    args = parser.parse_args()
+    benchmark(args.store, args.queries, args.k, args.nprobe, args.rerank, args.noise)
@@ -0,0 +1,145 @@
+# build_assets.py
+"""Fingerprint, precompress and convert the files in app/static.
+
+Every asset is copied to app/static/dist with a content hash in its name
+(css/base.css -> css/base.3f2a9c1b7d.css), so it can be cached forever and a
+deploy only changes the names of files that changed. Text assets also get
+.gz and .br (if the brotli package is installed) siblings, and PNG/JPEG images
+get WebP and AVIF versions when Pillow can write them. The mapping is written
+to dist/manifest.json, which app/assets.py reads.
+
+    python scripts/build_assets.py
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import shutil
+import sys
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = features = None
+
+ROOT = Path(__file__).resolve().parent.parent
+STATIC_DIR = ROOT / "app" / "static"
+DIST_NAME = "dist"
+
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".webmanifest", ".ico", ".txt", ".html"}
+CONVERTIBLE = {".png", ".jpg", ".jpeg"}
+# Quality settings: WebP/AVIF are visually lossless well below their maximum
+IMAGE_FORMATS = {"webp": {"quality": 82, "method": 6}, "avif": {"quality": 60}}
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:10]
+
+def hashed_name(rel_path, data, suffix=None):
+    suffix = suffix or rel_path.suffix
+    return rel_path.with_name(f"{rel_path.stem}.{content_hash(data)}{suffix}")
+
+def can_write(fmt):
+    if Image is None:
+        return False
+    if fmt == "avif":
+        # Pillow >= 11.2 has AVIF built in; older versions need pillow-avif-plugin
+        try:
+            import pillow_avif  # noqa: F401
+            return True
+        except ImportError:
+            return bool(features.check("avif")) if hasattr(features, "check") else False
+    return bool(features.check(fmt))
+
+def write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+def precompress(path, data):
+    """Write .gz and .br next to ``path``; returns the encodings written"""
+    encodings = []
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) < len(data):
+        write(path.with_name(path.name + ".gz"), compressed)
+        encodings.append("gzip")
+    if brotli is not None:
+        compressed = brotli.compress(data, quality=11)
+        if len(compressed) < len(data):
+            write(path.with_name(path.name + ".br"), compressed)
+            encodings.append("br")
+    return encodings
+
+def convert_image(src, rel_path, dist_dir, formats):
+    """WebP/AVIF versions of an image; returns {format: hashed relative path}"""
+    converted = {}
+    with Image.open(src) as image:
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+        for fmt in formats:
+            out = dist_dir / f"tmp.{fmt}"
+            image.save(out, fmt.upper(), **IMAGE_FORMATS[fmt])
+            data = out.read_bytes()
+            out.unlink()
+            if len(data) >= src.stat().st_size:
+                continue  # no gain, the original is served
+            target = hashed_name(rel_path, data, f".{fmt}")
+            write(dist_dir / target, data)
+            converted[fmt] = target.as_posix()
+    return converted
+
+def build(static_dir=STATIC_DIR, clean=True):
+    dist_dir = static_dir / DIST_NAME
+    if clean and dist_dir.exists():
+        shutil.rmtree(dist_dir)
+    dist_dir.mkdir(parents=True, exist_ok=True)
+
+    formats = [fmt for fmt in IMAGE_FORMATS if can_write(fmt)]
+    manifest = {}
+    original_bytes = served_bytes = 0
+
+    for src in sorted(static_dir.rglob("*")):
+        if not src.is_file() or dist_dir in src.parents:
+            continue
+        rel_path = src.relative_to(static_dir)
+        data = src.read_bytes()
+        target = hashed_name(rel_path, data)
+        write(dist_dir / target, data)
+
+        entry = {"file": target.as_posix()}
+        if src.suffix.lower() in COMPRESSIBLE:
+            entry["encodings"] = precompress(dist_dir / target, data)
+        if src.suffix.lower() in CONVERTIBLE and formats:
+            entry["formats"] = convert_image(src, rel_path, dist_dir, formats)
+        manifest[rel_path.as_posix()] = entry
+
+        best = min([len(data)] + [(dist_dir / p).stat().st_size for p in entry.get("formats", {}).values()])
+        if "br" in entry.get("encodings", []):
+            best = min(best, (dist_dir / f"{target}.br").stat().st_size)
+        elif "gzip" in entry.get("encodings", []):
+            best = min(best, (dist_dir / f"{target}.gz").stat().st_size)
+        original_bytes += len(data)
+        served_bytes += best
+
+    with open(dist_dir / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    print(f"📦 {len(manifest)} assets -> {dist_dir.relative_to(ROOT)}")
+    print(f"   brotli: {'yes' if brotli else 'no (pip install brotli)'}, "
+          f"images: {', '.join(formats) or 'none (pip install Pillow)'}")
+    print(f"   {original_bytes / 1024:.0f} KB original -> {served_bytes / 1024:.0f} KB best variant")
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description="Build fingerprinted, precompressed static assets")
+    parser.add_argument("--static-dir", type=Path, default=STATIC_DIR)
+    parser.add_argument("--no-clean", action="store_true", help="keep files from previous builds")
+    args = parser.parse_args()
+    build(args.static_dir, clean=not args.no_clean)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""Run the mail queue against a local SMTP sink and check delivery, retry and give-up.
+
+Starts a small SMTP server on localhost that accepts mail, or refuses the
+next N messages with a temporary 451 error. The app's MailQueue is pointed
+at it, and the script checks that:
+
+- queued messages are delivered over one reused connection
+- a refused message is retried with backoff and then delivered
+- a message refused on every attempt is recorded in ``mail_failures``
+
+Failures are written to a scratch database on the given mongod, which is
+dropped afterwards. Exits 1 if any check fails.
+
+    python scripts/check_mailer.py --uri mongodb://localhost:27017/
+"""
+import argparse
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+from flask import Flask
+from flask_mail import Mail, Message
+from pymongo import MongoClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.mailer import MailQueue
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT."""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        sink = self.server
+        sink.connections += 1
+        recipients = []
+        self.reply("220 localhost check_mailer sink")
+        for raw in self.rfile:
+            command = raw.decode(errors="replace").strip()
+            verb = command[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 localhost")
+            elif verb == "MAIL":
+                recipients = []
+                with sink.lock:
+                    refuse = sink.refuse_next > 0
+                    sink.refuse_next -= refuse
+                    sink.refused += refuse
+                self.reply("451 4.3.0 Try again later" if refuse else "250 OK")
+            elif verb == "RCPT":
+                recipients.append(command.split(":", 1)[1].strip(" <>"))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                for line in self.rfile:
+                    if line.rstrip(b"\r\n") == b".":
+                        break
+                with sink.lock:
+                    sink.delivered.extend(recipients)
+                self.reply("250 OK")
+            elif verb in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+class Sink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("localhost", 0), SinkHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.refuse_next = 0
+        self.refused = 0
+        self.delivered = []
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return condition()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uri", default="mongodb://localhost:27017/")
+    parser.add_argument("--db", default="movie_app_mail_check")
+    args = parser.parse_args()
+
+    sink = Sink()
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+
+    app = Flask(__name__)
+    app.config.update(
+        MAIL_SERVER="localhost", MAIL_PORT=sink.server_address[1],
+        MAIL_USE_TLS=False, MAIL_USE_SSL=False, MAIL_USERNAME=None, MAIL_PASSWORD=None,
+        MAIL_DEFAULT_SENDER="check@localhost",
+    )
+    Mail(app)
+    client = MongoClient(args.uri, serverSelectionTimeoutMS=3000)
+    client.drop_database(args.db)
+    app.db = client[args.db]
+
+    max_retries = 3
+    mail_queue = MailQueue(app, workers=1, max_retries=max_retries, backoff=0.1, idle_timeout=5)
+
+    def message(recipient):
+        with app.app_context():
+            return Message(subject=f"check {recipient}", recipients=[recipient], body="check")
+
+    results = []
+    try:
+        # Success: three messages, one SMTP connection
+        for i in range(3):
+            mail_queue.submit(message(f"ok{i}@example.com"))
+        delivered = wait_for(lambda: len(sink.delivered) == 3)
+        results.append(("delivered over one connection", delivered and sink.connections == 1,
+                        f"{len(sink.delivered)} delivered, {sink.connections} connection(s)"))
+
+        # Retry: refused twice, delivered on the third attempt
+        sink.refuse_next = 2
+        mail_queue.submit(message("retry@example.com"))
+        delivered = wait_for(lambda: "retry@example.com" in sink.delivered)
+        results.append(("retried with backoff, then delivered", delivered and mail_queue.retried == 2,
+                        f"retried {mail_queue.retried}, refused {sink.refused}"))
+
+        # Give up: refused on every attempt, recorded durably
+        sink.refuse_next = max_retries
+        mail_queue.submit(message("fail@example.com"))
+        recorded = wait_for(lambda: app.db.mail_failures.count_documents({}) == 1)
+        failure = app.db.mail_failures.find_one() or {}
+        results.append(("gave up and recorded in mail_failures",
+                        recorded and failure.get("attempts") == max_retries
+                        and failure.get("recipients") == ["fail@example.com"],
+                        f"attempts {failure.get('attempts')}, failed {mail_queue.failed}"))
+    finally:
+        mail_queue.close(timeout=5)
+        sink.shutdown()
+        client.drop_database(args.db)
+
+    for name, ok, detail in results:
+        print(f"{'ok' if ok else 'FAIL':4} {name} ({detail})")
+    sys.exit(0 if all(ok for _, ok, _ in results) else 1)
+
+if __name__ == "__main__":
+    main()
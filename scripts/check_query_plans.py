@@ -0,0 +1,102 @@
+# check_query_plans.py
+"""Explain every hot query against a local mongod and fail on collection scans.
+
+Runs the schema migrations on a scratch database, seeds a few documents so the
+planner has something to choose from, then explains each query in
+app.db_schema.HOT_QUERIES plus the conversation listing aggregation. Exits 1
+if any winning plan contains a COLLSCAN stage.
+
+    python scripts/check_query_plans.py --uri mongodb://localhost:27017/
+"""
+import argparse
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from pymongo import MongoClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.db_schema import migrate, HOT_QUERIES
+
+def seed(db, n_users=50, days=5):
+    now = datetime(2000, 1, 1)
+    db.users.insert_many([
+        {"username": f"user{i}", "email": f"user{i}@example.com", "password": "x",
+         "verification_token": None, "reset_token": None, "reset_token_expiry": None}
+        for i in range(n_users)
+    ])
+    conversations, buckets = [], []
+    for i in range(n_users):
+        for d in range(days):
+            day = now + timedelta(days=d)
+            key = f"user{i}:{day:%Y-%m-%d}"
+            conversations.append({"user_id": f"user{i}", "day": f"{day:%Y-%m-%d}", "key": key,
+                                  "created_at": day, "updated_at": day, "message_count": 1})
+            buckets.append({"conversation_key": key, "user_id": f"user{i}", "count": 1,
+                            "messages": [{"user": "hi", "bot": "hello", "timestamp": day}]})
+    db.conversations.insert_many(conversations)
+    db.conversation_messages.insert_many(buckets)
+
+def stages(plan):
+    """Every stage name in an explain plan tree."""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from stages(value)
+
+def winning_plan(explain):
+    # find() explain, or an aggregate explain whose first stage is $cursor
+    if "queryPlanner" in explain:
+        return explain["queryPlanner"]["winningPlan"]
+    for stage in explain.get("stages", []):
+        if "$cursor" in stage:
+            return stage["$cursor"]["queryPlanner"]["winningPlan"]
+    return explain
+
+def check(db):
+    from app.conversations import conversation_listing_pipeline
+    plans = []
+    for name, collection, filter_, sort in HOT_QUERIES:
+        cursor = db[collection].find(filter_)
+        if sort:
+            cursor = cursor.sort(sort)
+        plans.append((name, winning_plan(cursor.explain())))
+    
+    explain = db.command("aggregate", "conversations", pipeline=conversation_listing_pipeline("user1", limit=20),
+                         explain=True)
+    plans.append(("conversation listing aggregation", winning_plan(explain)))
+    
+    failures = 0
+    for name, plan in plans:
+        found = list(stages(plan))
+        ok = "COLLSCAN" not in found
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {name}: {' <- '.join(found)}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uri", default="mongodb://localhost:27017/")
+    parser.add_argument("--db", default="movie_app_plan_check", help="scratch database, dropped before and after")
+    args = parser.parse_args()
+    
+    client = MongoClient(args.uri, serverSelectionTimeoutMS=3000)
+    client.drop_database(args.db)
+    db = client[args.db]
+    try:
+        migrate(db)
+        seed(db)
+        failures = check(db)
+    finally:
+        client.drop_database(args.db)
+    
+    if failures:
+        print(f"{failures} hot queries scan a whole collection")
+        sys.exit(1)
+    print("All hot queries use an index")
+
+if __name__ == "__main__":
+    main()
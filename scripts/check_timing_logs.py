@@ -0,0 +1,57 @@
+"""Check that every request gets its TIMING log line.
+
+Builds a bare Flask app with the real logging and timing setup (no Mongo,
+TMDB or models needed), sends N requests and counts the ``TIMING`` lines that
+reach the log output. Rate limiting and sampling must not drop any of them.
+Exits 1 on a mismatch.
+
+    python scripts/check_timing_logs.py --requests 100
+"""
+import argparse
+import io
+import sys
+from pathlib import Path
+from flask import Flask
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app import logging_setup
+from app.timing import init_timing
+
+def count_timing_lines(n_requests, log_format):
+    app = Flask(__name__)
+    app.config.update(
+        TIMING_ENABLED=True, TIMING_LOG_RECORDS=True, TIMING_LOG_MIN_MS=0,
+        LOG_LEVEL="INFO", LOG_FORMAT=log_format,
+        # Defaults that used to cut TIMING lines off at 20 per minute
+        LOG_SAMPLE_RATE=0.01, LOG_RATE_LIMIT=20, LOG_RATE_WINDOW=60,
+    )
+    logging_setup.configure_logging(app)
+    output = io.StringIO()
+    logging_setup._handler.output.setStream(output)
+    init_timing(app)
+
+    @app.route("/ping")
+    def ping():
+        return "pong"
+
+    client = app.test_client()
+    for _ in range(n_requests):
+        client.get("/ping")
+    logging_setup._handler.stop()  # flushes the queue
+    return sum(1 for line in output.getvalue().splitlines() if "TIMING {" in line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100)
+    args = parser.parse_args()
+
+    failed = False
+    for log_format in ("text", "json"):
+        logged = count_timing_lines(args.requests, log_format)
+        status = "ok" if logged == args.requests else "FAIL"
+        print(f"{status:4} {log_format}: {logged}/{args.requests} TIMING lines")
+        failed |= logged != args.requests
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
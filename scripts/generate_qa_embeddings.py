@@ -1,14 +1,22 @@
 # generate_qa_embeddings.py
 import pandas as pd
-import torch
 from sentence_transformers import SentenceTransformer
-import pickle
 from pathlib import Path
+import argparse
+import pickle
+import sys
 import os
 
-def create_chatbot_model():
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.qa_store import write_qa_store, load_qa_store
+from app.ann import build_ivf, save_ivf
+
+STORE_DIR = 'chatbot_model/qa_store'
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+def create_chatbot_model(store_dir=STORE_DIR):
     """Generate Q&A embeddings for movie chatbot"""
-    Path('chatbot_model').mkdir(exist_ok=True)
+    Path(store_dir).mkdir(parents=True, exist_ok=True)
     
     # Load Q&A dataset
     print("📖 Loading Q&A dataset...")
@@ -24,33 +32,65 @@ def create_chatbot_model():
     
     # Load model (will use cache if available)
     try:
-        model = SentenceTransformer('all-MiniLM-L6-v2', local_files_only=True)
+        model = SentenceTransformer(MODEL_NAME, local_files_only=True)
         print("✅ Model loaded from local cache")
     except Exception as e:
         print(f"❌ Cache load failed: {e}")
         print("🔧 Attempting to download model...")
         # Fallback to online download
         os.environ['TRANSFORMERS_OFFLINE'] = '0'  # Enable online
-        model = SentenceTransformer('all-MiniLM-L6-v2')
+        model = SentenceTransformer(MODEL_NAME)
     
     # Generate embeddings
     print("⚡ Generating embeddings...")
-    question_embeddings = model.encode(questions, convert_to_tensor=True, show_progress_bar=True)
-    
-    # Save dataset
-    output_data = {
-        'questions': questions,
-        'answers': answers,
-        'embeddings': question_embeddings.cpu(),
-        'dataframe': df,
-        'model_name': 'all-MiniLM-L6-v2'
-    }
-    
-    with open('chatbot_model/qa_dataset.pkl', 'wb') as f:
-        pickle.dump(output_data, f)
-    
-    print(f"✅ Saved embeddings for {len(questions)} questions to chatbot_model/qa_dataset.pkl")
-    return output_data
+    question_embeddings = model.encode(
+        questions, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=True
+    )
+    
+    meta = write_qa_store(store_dir, questions, answers, question_embeddings, MODEL_NAME)
+    
+    print(f"✅ Saved {meta['count']} x {meta['dim']} {meta['dtype']} embeddings to {store_dir}")
+    return meta
+
+def build_ann_index(store_dir=STORE_DIR, n_lists=None, pq_m=0):
+    """Build the IVF (optionally IVF-PQ) index next to an existing store"""
+    _, _, embeddings, _ = load_qa_store(store_dir)
+    print(f"🧭 Building IVF index over {embeddings.shape[0]} embeddings (pq_m={pq_m})...")
+    index = build_ivf(embeddings, n_lists=n_lists, pq_m=pq_m)
+    meta = save_ivf(store_dir, index)
+    print(f"✅ Saved IVF index with {meta['lists']} lists to {store_dir}")
+    return meta
+
+def convert_pickle(pkl_path='chatbot_model/qa_dataset.pkl', store_dir=STORE_DIR):
+    """Convert a legacy qa_dataset.pkl into the memory-mapped store without re-encoding"""
+    print(f"📖 Loading legacy pickle {pkl_path}...")
+    with open(pkl_path, 'rb') as f:
+        data = pickle.load(f)
+    
+    meta = write_qa_store(
+        store_dir,
+        data['questions'],
+        data['answers'],
+        data['embeddings'],
+        data.get('model_name', MODEL_NAME),
+    )
+    print(f"✅ Converted {meta['count']} Q&A pairs to {store_dir}")
+    return meta
 
 if __name__ == "__main__":
-    create_chatbot_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build the chatbot Q&A embedding store")
+    parser.add_argument('--out', default=STORE_DIR, help="output store directory")
+    parser.add_argument('--from-pickle', metavar='PKL', help="convert an existing qa_dataset.pkl instead of encoding")
+    parser.add_argument('--index-only', action='store_true', help="only (re)build the ANN index of an existing store")
+    parser.add_argument('--no-index', action='store_true', help="skip building the ANN index")
+    parser.add_argument('--ivf-lists', type=int, default=None, help="number of IVF lists (default: sqrt(rows))")
+    parser.add_argument('--pq-m', type=int, default=0, help="PQ sub-vectors per embedding, 0 to disable PQ")
+    args = parser.parse_args()
+    
+    if not args.index_only:
+        if args.from_pickle:
+            convert_pickle(args.from_pickle, args.out)
+        else:
+            create_chatbot_model(args.out)
+    if not args.no_index:
+        build_ann_index(args.out, n_lists=args.ivf_lists, pq_m=args.pq_m)